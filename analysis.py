@@ -0,0 +1,204 @@
+"""Combine the marker logs of many sessions into one tidy table of questionnaire answers.
+
+Logs are spread over a process pool in chunks, and each chunk is parsed in one pass
+of vectorized pandas/NumPy operations, so a directory of thousands of sessions is
+processed in seconds:
+
+    python analysis.py logs/ --output answers.csv
+
+One output row per `<question>_Response` marker:
+    participant, session, assessment_s, question, value, latency_s
+where assessment_s is the time of the enclosing `rpe_assessment: Ns` marker and
+latency_s is the time of the response relative to the preceding `rpe_onset`.
+String CSV logs, event-code CSV logs (with their `_codebook.csv`) and binary logs
+are all read.
+"""
+import argparse
+import csv
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from marker_binlog import NO_VALUE, read_binlog
+
+COLUMNS = ['participant', 'session', 'assessment_s', 'question', 'value', 'latency_s']
+
+# Files written next to a log that are not logs themselves
+SIDECAR_SUFFIXES = ('_clock_offsets.csv', '_responses.csv', '_codebook.csv', '_frames.json', '_startup.json',
+                    '_flips.csv')
+
+# 'affect_Response: 5' -> ('affect_Response', '5'); 'rpe_assessment: 120s' -> ('rpe_assessment', '120')
+MARKER_PATTERN = r'^(?P<name>.*?)(?:: (?P<value>-?\d+)s?)?$'
+# The same split for marker_binlog templates such as 'affect_Response: {}'
+TEMPLATE_SUFFIX = r': \{\}s?$'
+
+
+def find_logs(directory):
+    """Return every marker log (.csv or .bin) below directory, sorted"""
+    logs = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(('.csv', '.bin')) and not name.endswith(SIDECAR_SUFFIXES):
+                logs.append(os.path.join(root, name))
+    return sorted(logs)
+
+
+def _read_csv_columns(path):
+    """Return {column: tuple of strings} of a small CSV file (cheaper than pandas for a few hundred rows)"""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        columns = list(zip(*reader))
+    if not header:
+        return {}
+    return dict(zip(header, columns or [()] * len(header)))
+
+
+def read_log(path):
+    """Return the markers of one log as {'marker', 'name', 'value', 'time'} arrays, or None.
+
+    String logs only fill 'marker' (the raw text, parsed later for many logs at once);
+    binary and event-code logs already carry 'name' and 'value'.
+    """
+    if path.endswith('.bin'):
+        records, strings = read_binlog(path)
+        templates = pd.Series(strings, dtype=object).str.replace(TEMPLATE_SUFFIX, '', regex=True).to_numpy()
+        values = np.where(records['value'] != NO_VALUE, records['value'], np.nan)
+        times = np.where(np.isnan(records['lsl_time']), records['wall_time'], records['lsl_time'])
+        return {'marker': None, 'name': templates[records['code']], 'value': values, 'time': times}
+
+    columns = _read_csv_columns(path)
+    # Older logs have no LSLTimestamp column; fall back to the wall-clock time
+    times = columns.get('LSLTimestamp', columns.get('Timestamp'))
+    if times is None:
+        return None
+    times = np.asarray(times, dtype=float)
+    if 'StimMarkersAlpha' in columns:
+        return {'marker': np.asarray(columns['StimMarkersAlpha'], dtype=object), 'name': None, 'value': None,
+                'time': times}
+    if 'EventCode' in columns:
+        codebook = _read_csv_columns(os.path.splitext(path)[0] + '_codebook.csv')
+        templates = pd.Series(codebook['Name'], dtype=object).str.replace(TEMPLATE_SUFFIX, '', regex=True).to_numpy()
+        values = np.asarray(columns['Value'], dtype=float)
+        values[values == NO_VALUE] = np.nan
+        return {'marker': None, 'name': templates[np.asarray(columns['EventCode'], dtype=int)], 'value': values,
+                'time': times}
+    return None
+
+
+def participant_of(path, pattern=None):
+    """Participant id of a log: the named group 'participant' of pattern, else the file name"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if pattern is not None:
+        match = re.search(pattern, path)
+        if match is not None:
+            return match.group('participant')
+    return stem
+
+
+def parse_logs(logs):
+    """Parse {path: markers} (see read_log) into flat arrays over all logs.
+
+    Returns a dict of 'log' (index into the paths), 'name' (marker name without its
+    number, e.g. 'affect_Response'), 'value' (the number, NaN if none) and 'time'.
+    """
+    lengths = [len(log['time']) for log in logs.values()]
+    log_ids = np.repeat(np.arange(len(logs)), lengths)
+    times = np.concatenate([log['time'] for log in logs.values()])
+
+    def column(key, fill, dtype):
+        return np.concatenate([log[key] if log[key] is not None else np.full(n, fill, dtype=dtype)
+                               for log, n in zip(logs.values(), lengths)])
+    markers, names, values = column('marker', None, object), column('name', None, object), column('value', np.nan, float)
+
+    # Split the marker text of all string logs at once. Sessions share a small set of
+    # distinct markers, so each distinct string is parsed once and mapped back by code.
+    is_text = pd.notna(markers)
+    if is_text.any():
+        codes, unique_markers = pd.factorize(markers[is_text])
+        parts = pd.Series(unique_markers, dtype=object).str.extract(MARKER_PATTERN)
+        names[is_text] = parts['name'].to_numpy(dtype=object)[codes]
+        values[is_text] = pd.to_numeric(parts['value']).to_numpy(dtype=float)[codes]
+    return {'log': log_ids, 'name': names, 'value': values, 'time': times}
+
+
+def tidy(logs, participant_pattern=None):
+    """Build the answer table from {path: markers} (see read_log) in one vectorized pass"""
+    if not logs:
+        return pd.DataFrame(columns=COLUMNS)
+    paths = list(logs)
+    parsed = parse_logs(logs)
+    log_ids, names, values, times = parsed['log'], parsed['name'], parsed['value'], parsed['time']
+
+    # Name tests also run once per distinct name
+    name_codes, unique_names = pd.factorize(names)
+    unique_names = pd.Series(unique_names, dtype=object)
+    is_response = unique_names.str.endswith('_Response').to_numpy(dtype=bool)[name_codes]
+    is_assessment = (unique_names == 'rpe_assessment').to_numpy()[name_codes]
+    is_onset = (unique_names == 'rpe_onset').to_numpy()[name_codes]
+    questions = unique_names.str.slice(stop=-len('_Response')).to_numpy(dtype=object)
+
+    # Carry the enclosing assessment and its onset time forward onto the answers, per log
+    assessment = pd.Series(np.where(is_assessment, values, np.nan)).groupby(log_ids).ffill().to_numpy()
+    onset = pd.Series(np.where(is_onset, times, np.nan)).groupby(log_ids).ffill().to_numpy()
+
+    response_logs = log_ids[is_response]
+    participants = np.asarray([participant_of(path, participant_pattern) for path in paths], dtype=object)
+    return pd.DataFrame({
+        'participant': participants[response_logs],
+        'session': np.asarray(paths, dtype=object)[response_logs],
+        'assessment_s': pd.array(assessment[is_response], dtype='Int32'),
+        'question': questions[name_codes[is_response]],
+        'value': pd.array(values[is_response], dtype='Int32'),
+        'latency_s': (times - onset)[is_response],
+    }, columns=COLUMNS)
+
+
+def load_session(path, participant_pattern=None):
+    """Parse one log into the tidy answer table"""
+    markers = read_log(path)
+    return tidy({path: markers} if markers is not None else {}, participant_pattern)
+
+
+def _load_chunk(args):
+    paths, participant_pattern = args
+    logs = {path: read_log(path) for path in paths}
+    return tidy({path: markers for path, markers in logs.items() if markers is not None}, participant_pattern)
+
+
+def analyze(paths, workers=None, participant_pattern=None):
+    """Parse logs in parallel and return one tidy table"""
+    paths = list(paths)
+    if not paths:
+        return pd.DataFrame(columns=COLUMNS)
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker keeps them all busy without a process round trip per file
+    n_chunks = min(len(paths), workers * 4)
+    chunks = [(list(chunk), participant_pattern) for chunk in np.array_split(np.asarray(paths, dtype=object), n_chunks)]
+    if workers == 1:
+        tables = [_load_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tables = list(pool.map(_load_chunk, chunks))
+    return pd.concat(tables, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tidy table of questionnaire answers across sessions')
+    parser.add_argument('directory', help='Directory searched recursively for marker logs.')
+    parser.add_argument('--output', type=str, default='answers.csv', help='CSV file for the tidy table.')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores).')
+    parser.add_argument('--participant-pattern', type=str, default=None,
+                        help="Regex with a named group 'participant' applied to each log path "
+                             "(default: the log's file name).")
+    args = parser.parse_args()
+
+    paths = find_logs(args.directory)
+    table = analyze(paths, workers=args.workers, participant_pattern=args.participant_pattern)
+    table.to_csv(args.output, index=False)
+    print(f"Wrote {len(table)} answers from {len(paths)} logs to {args.output}")
+
+if __name__ == "__main__":
+    main()
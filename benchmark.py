@@ -0,0 +1,192 @@
+"""Benchmarks for questionnaire page construction and the rating frame loops.
+
+Runs headlessly against the stand-in windows from simulation.py, so it measures the
+Python-side cost of our own code (page building, per-frame logic, draw calls issued)
+rather than GPU time. Results are written as JSON so runs can be compared:
+
+    python benchmark.py --output bench_new.json --compare bench_old.json
+"""
+import argparse
+import collections
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+import simulation
+
+
+def _stats(values):
+    """Summary of a list of durations in seconds, reported in microseconds"""
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'n': len(values),
+        'mean_us': 1e6 * statistics.fmean(values),
+        'p50_us': 1e6 * values[len(values) // 2],
+        'p99_us': 1e6 * values[min(len(values) - 1, int(len(values) * 0.99))],
+        'max_us': 1e6 * values[-1],
+    }
+
+
+class FrameCostRecorder:
+    """Stands in for DualDisplay and records the wall time spent between flips.
+
+    Each cost is grouped by the number of ticks on the slider drawn that frame, i.e.
+    the 11-tick affect scale, the 6-tick arousal scale and the 5-tick agreement scale.
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.costs = collections.defaultdict(list)
+        self._last = None
+
+    def flip(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            sliders = [stim for stim in self.display.win1.drawn if isinstance(stim, simulation.Slider)]
+            if sliders:
+                self.costs[len(sliders[0].ticks)].append(now - self._last)
+        result = self.display.flip()
+        self._last = time.perf_counter()
+        return result
+
+
+def bench_page_construction(rpe_key, win1, win2, repeats):
+    """Time create_page for each scale, and a full prewarm of every page"""
+    results = {}
+    for title, (value_dict, subtitles) in rpe_key.titles.items():
+        subtitle = next(iter(subtitles.values()))
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rpe_key.create_page(win1, win2, title, subtitle, value_dict, True)
+            durations.append(time.perf_counter() - start)
+        results[f'{len(value_dict)}_ticks'] = _stats(durations)
+
+    durations = []
+    for _ in range(max(1, repeats // 10)):
+        rpe_key._page_cache.clear()
+        rpe_key._static_layer_cache.clear()
+        start = time.perf_counter()
+        rpe_key.prewarm_pages(win1, win2, full=True)
+        durations.append(time.perf_counter() - start)
+    results['prewarm_all_pages'] = _stats(durations)
+    return results
+
+
+def bench_run_rpe(rpe_key, win1, win2, assessments, static_layers):
+    """Per-frame cost of run_rpe by scale, plus memory growth across repeated assessments"""
+    # Imported here so pynput resolves to the stand-in installed by run_benchmarks
+    from display import DualDisplay
+    from input_service import InputService
+
+    outlet = simulation.StreamOutlet(simulation.StreamInfo('BenchMarkers', 'Markers', 1, 0, 'string', 'bench'))
+    input_service = InputService()
+    input_service.start()
+    recorder = FrameCostRecorder(DualDisplay(win1, win2, mode='primary'))
+
+    # Count only memory held by project code, not the recorder or the stand-ins
+    exclude = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, simulation.__file__)]
+    tracemalloc.start()
+    memory = []
+    for _ in range(assessments):
+        rpe_key.run_rpe(win1=win1, win2=win2, full=True, outlet=outlet, input_service=input_service,
+                        display=recorder, static_layers=static_layers)
+        snapshot = tracemalloc.take_snapshot().filter_traces(exclude)
+        memory.append(sum(stat.size for stat in snapshot.statistics('filename')))
+    tracemalloc.stop()
+    input_service.stop()
+
+    return {
+        'frame_cost': {f'{ticks}_ticks': _stats(costs) for ticks, costs in sorted(recorder.costs.items())},
+        'memory_bytes_after_each_assessment': memory,
+        'memory_growth_bytes': memory[-1] - memory[0],
+    }
+
+
+def bench_rpe_hover(continuous):
+    """Per-frame cost of the rpe.py hover loop"""
+    sim = simulation.Simulation()
+    simulation.install(sim)
+    import rpe  # Imported only now so it binds to the stand-ins
+    args = rpe.build_parser().parse_args(['--continuous'] if continuous else [])
+    start = time.perf_counter()
+    try:
+        rpe.run_task(args)
+    except simulation.SimulationFinished:
+        pass
+    elapsed = time.perf_counter() - start
+    return {'flips': sim.n_flips, 'mean_frame_us': 1e6 * elapsed / max(sim.n_flips, 1)}
+
+
+def run_benchmarks(repeats=200, assessments=6):
+    simulation.install(simulation.Simulation(response_delay=2.0))
+    import rpe_key  # Imported only now so it binds to the stand-ins
+    simulation.use_virtual_time()
+
+    win1 = simulation.Window()
+    win2 = simulation.Window()
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'simulation stand-ins',
+        },
+        'page_construction': bench_page_construction(rpe_key, win1, win2, repeats),
+        'run_rpe': bench_run_rpe(rpe_key, win1, win2, assessments, static_layers=False),
+        'run_rpe_static_layers': bench_run_rpe(rpe_key, win1, win2, assessments, static_layers=True),
+        'rpe_hover': bench_rpe_hover(continuous=False),
+        'rpe_hover_continuous': bench_rpe_hover(continuous=True),
+    }
+    return results
+
+
+def _flatten(results, prefix=''):
+    """Flatten nested results into {'a.b.c': number} for comparison"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(new, old):
+    """Print the relative change of every timing and memory metric"""
+    new_flat, old_flat = _flatten(new), _flatten(old)
+    for name in sorted(new_flat):
+        if name in old_flat and (name.endswith('_us') or name.endswith('_bytes')) and old_flat[name]:
+            change = 100 * (new_flat[name] - old_flat[name]) / old_flat[name]
+            print(f"{name:70s} {old_flat[name]:12.1f} -> {new_flat[name]:12.1f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Questionnaire and frame loop benchmarks')
+    parser.add_argument('--output', type=str, default='bench_results.json',
+                        help='JSON file for the results.')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Earlier results JSON to compare against.')
+    parser.add_argument('--repeats', type=int, default=200,
+                        help='Repetitions of each page construction.')
+    parser.add_argument('--assessments', type=int, default=6,
+                        help='Number of back-to-back assessments for the frame loop and memory runs.')
+    args = parser.parse_args()
+
+    results = run_benchmarks(repeats=args.repeats, assessments=args.assessments)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
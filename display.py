@@ -0,0 +1,180 @@
+import csv
+import time
+import numpy as np
+from pylsl import local_clock
+from lazy_import import LazyModule
+
+core = LazyModule('psychopy.core')
+
+DISPLAY_MODES = ('serial', 'primary')
+
+# Columns of the per-flip record (LSL times in seconds): when each window's flip() returned
+# and when each screen is estimated to show the new frame
+FLIP_FIELDS = ('win1_flip', 'win2_flip', 'win1_present', 'win2_present')
+
+
+class DualDisplay:
+    """Flip the participant window (win1) and the experimenter window (win2) together.
+
+    Modes:
+        primary: only win1 waits for vertical blanking. win2 has vsync and waitBlanking
+            turned off and is flipped first, so its swap is queued without blocking and
+            both screens update within the same win1 frame. Each loop iteration costs one
+            refresh instead of two.
+        serial: the original behaviour, win1.flip() then win2.flip(), each waiting for
+            its own blanking interval.
+
+    Every flip stamps each window with local_clock() right after its own flip() call
+    returns (Window.flip() returns None when waitBlanking is off, so its return value
+    cannot be used) and estimates when each screen shows the new frame:
+        - a window that waits for blanking presents when its flip() returns
+        - a window flipped without blanking (win2 in primary mode) only queues its swap;
+          the frame is fully scanned out by the end of that screen's next refresh, so it
+          is estimated to present one win2 refresh period after its flip() returned
+    The skew is win2's presentation minus win1's. Frames where the two screens show the
+    new frame on different refreshes (|skew| of half a win1 frame or more) are counted.
+    Every flip's four times are kept in a ring buffer (see flips() and write_flips()).
+    If a FrameTimer is attached, each flip also records draw time and per-window flip
+    wait. The win1 stamp is kept in last_flip_lsl, to compare with input event times.
+
+    Pacing: with a target_fps, flip() sleeps off whatever is left of each frame at that
+    rate before flipping, so loops run at a fixed rate below the refresh rate. Static
+    screens call idle() instead of redrawing: it sleeps for one frame without flipping,
+    and the screen keeps showing the last frame.
+    """
+
+    def __init__(self, win1, win2, mode='serial', frame_timer=None, target_fps=None, capacity=2 ** 17):
+        if mode not in DISPLAY_MODES:
+            raise ValueError(f"Unknown display mode '{mode}', expected one of {DISPLAY_MODES}")
+        self.win1 = win1
+        self.win2 = win2
+        self.mode = mode
+        self.frame_timer = frame_timer
+
+        if mode == 'primary':
+            self.win2.waitBlanking = False
+            # The pyglet backend exposes the native window; turn off its swap interval
+            win_handle = getattr(getattr(win2, 'backend', None), 'winHandle', None) or getattr(win2, 'winHandle', None)
+            if hasattr(win_handle, 'set_vsync'):
+                win_handle.set_vsync(False)
+
+        # Nominal frame period of the participant screen, used to judge the skew, and of
+        # the experimenter screen, used to estimate when an unsynchronized swap is shown
+        self.frame_period = getattr(win1, 'monitorFramePeriod', None) or 1 / 60
+        self.frame_period2 = getattr(win2, 'monitorFramePeriod', None) or self.frame_period
+        self.target_period = 1 / target_fps if target_fps else None
+        self._next_frame = None  # perf_counter deadline of the next paced flip
+        self.n_idle = 0
+
+        # Per-window LSL flip stamps of every frame (ring buffer) and running skew stats
+        self.capacity = capacity
+        self.flip_times = np.zeros((capacity, len(FLIP_FIELDS)), dtype=np.float64)
+        self.last_flip = (None, None)
+        self.last_flip_lsl = None
+        self.n_flips = 0
+        self.total_skew = 0.0
+        self.max_skew = 0.0
+        self.late_flips = 0  # Frames where the two screens showed the new frame on different refreshes
+
+    def flip(self):
+        """Flip both windows and return the win1 flip timestamp"""
+        if self.target_period is not None:
+            self._pace()
+        if self.frame_timer is not None:
+            return self._timed_flip()
+        if self.mode == 'primary':
+            self.win2.flip()  # Non-blocking, queued before win1 waits for vsync
+            lsl2 = local_clock()
+            t1 = self.win1.flip()
+            lsl1 = local_clock()
+        else:
+            t1 = self.win1.flip()
+            lsl1 = local_clock()
+            self.win2.flip()
+            lsl2 = local_clock()
+        self._record(lsl1, lsl2)
+        return t1
+
+    def _pace(self):
+        """Sleep until the next frame at the target rate is due"""
+        now = time.perf_counter()
+        if self._next_frame is None or now - self._next_frame > self.target_period:
+            self._next_frame = now  # First frame, or fell behind: restart the schedule
+        elif self._next_frame > now:
+            core.wait(self._next_frame - now, hogCPUperiod=0)
+        self._next_frame += self.target_period
+
+    def idle(self, duration=None):
+        """Sleep for one frame (or duration seconds) without drawing or flipping"""
+        self.n_idle += 1
+        self._next_frame = None
+        if self.frame_timer is not None:
+            self.frame_timer.pause()  # The gap is not a dropped frame
+        core.wait(self.frame_period if duration is None else duration, hogCPUperiod=0)
+
+    def _timed_flip(self):
+        """flip() with the time spent in each window's flip measured"""
+        flip_start = time.perf_counter()
+        if self.mode == 'primary':
+            self.win2.flip()
+            lsl2 = local_clock()
+            mid = time.perf_counter()
+            t1 = self.win1.flip()
+            lsl1 = local_clock()
+            flip_end = time.perf_counter()
+            wait1, wait2 = flip_end - mid, mid - flip_start
+        else:
+            t1 = self.win1.flip()
+            lsl1 = local_clock()
+            mid = time.perf_counter()
+            self.win2.flip()
+            lsl2 = local_clock()
+            flip_end = time.perf_counter()
+            wait1, wait2 = mid - flip_start, flip_end - mid
+        self._record(lsl1, lsl2)
+        self.frame_timer.record(flip_start, flip_end, wait1, wait2)
+        return t1
+
+    def _record(self, lsl1, lsl2):
+        """Record the LSL times at which win1 and win2 finished flipping"""
+        self.last_flip = (lsl1, lsl2)
+        self.last_flip_lsl = lsl1
+        present2 = lsl2 + self.frame_period2 if self.mode == 'primary' else lsl2
+        row = self.flip_times[self.n_flips % self.capacity]
+        row[:] = (lsl1, lsl2, lsl1, present2)
+        self.n_flips += 1
+
+        skew = abs(present2 - lsl1)
+        self.total_skew += skew
+        if skew > self.max_skew:
+            self.max_skew = skew
+        if round(skew / self.frame_period) >= 1:
+            self.late_flips += 1
+
+    def flips(self):
+        """Return the recorded flips (at most capacity) as rows of FLIP_FIELDS, oldest first"""
+        n = self.n_flips
+        if n <= self.capacity:
+            return self.flip_times[:n].copy()
+        end = n % self.capacity
+        return np.concatenate((self.flip_times[end:], self.flip_times[:end]))
+
+    def write_flips(self, path):
+        """Write every recorded flip (per-window flip and presentation times, skew) as CSV"""
+        flips = self.flips()
+        with open(path, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(FLIP_FIELDS) + ['skew_ms'])
+            writer.writerows(zip(*flips.T.tolist(), (1000 * (flips[:, 3] - flips[:, 2])).tolist()))
+        return len(flips)
+
+    def report(self):
+        """Return a summary of the skew between the two screens' estimated presentation times"""
+        return {
+            'mode': self.mode,
+            'flips': self.n_flips,
+            'idle_frames': self.n_idle,
+            'mean_skew_ms': 1000 * self.total_skew / self.n_flips if self.n_flips else 0.0,
+            'max_skew_ms': 1000 * self.max_skew,
+            'flips_on_different_refresh': self.late_flips,
+        }
@@ -0,0 +1,64 @@
+import csv
+from marker_binlog import NO_VALUE, join_marker
+
+# Buttons that can appear in click-to-photon latency markers (see input_service.button_names)
+LATENCY_BUTTONS = ('left', 'right', 'middle', 'x1')
+
+
+class Codebook:
+    """Integer codes for every marker the experiment can send.
+
+    Names use the marker_binlog template form: a marker that carries a number, such
+    as 'affect_Response: 5', is the name 'affect_Response: {}' plus an int payload.
+    Codes are the position in the list, so a binary log written with the codebook
+    has the same codes in its string table.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def marker(self, code, value=NO_VALUE):
+        """Return the marker string an event code and payload stand for"""
+        return join_marker(self.names[code], value)
+
+    def write(self, path):
+        """Write the codebook as CSV (code, name)"""
+        with open(path, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['EventCode', 'Name'])
+            writer.writerows(enumerate(self.names))
+
+
+def build_codebook(text_mapping, titles, physio_labels=()):
+    """Generate the codebook from the screen keys, the questionnaire's question keys and
+    the labels of any physiological streams (e.g. 'hr', 'vo2')"""
+    names = []
+    for key in text_mapping:
+        names += [f'{key}_onset', f'{key}_offset']
+    names += [f'cool_down_{minutes}_hr' for minutes in range(1, 6)]
+    names += ['rpe_onset', 'rpe_offset', 'rpe_assessment: {}s', 'rpe_assessment_scheduled: {}s']
+    for _, subtitles in titles.values():
+        for question in subtitles:
+            names += [f'{question}_Response: {{}}', f'{question}_confirm']
+            names += [f'{question}_{button}_click_to_photon_us: {{}}' for button in LATENCY_BUTTONS]
+    for label in physio_labels:
+        names += [f'{label}_mean_x100: {{}}', f'{label}_slope_per_min_x100: {{}}']
+    return Codebook(names)
+
+
+def event_sample(codebook, name, value=NO_VALUE):
+    """LSL sample for an event: [marker string], or [code, value] with a codebook"""
+    if codebook is None:
+        return [join_marker(name, value)]
+    return [codebook.codes[name], value]
+
+
+def event_row(codebook, name, value, wall_time, lsl_time):
+    """Log row for an event: [marker, wall, lsl], or [code, wall, lsl, value] with a codebook"""
+    if codebook is None:
+        return [join_marker(name, value), wall_time, lsl_time]
+    return [codebook.codes[name], wall_time, lsl_time, value]
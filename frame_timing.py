@@ -0,0 +1,112 @@
+import json
+import time
+import numpy as np
+from pylsl import StreamInfo, StreamOutlet
+
+# Columns of the ring buffer (all in seconds)
+FRAME_FIELDS = ('interval', 'draw', 'flip_wait1', 'flip_wait2')
+
+# Whole-session histogram of frame intervals: 1 ms bins, last bin collects >= 100 ms
+HIST_MAX_MS = 100
+
+
+class FrameTimer:
+    """Opt-in per-frame timing for the render loops.
+
+    DualDisplay calls record() once per flip with the time spent drawing since the
+    previous flip and the time each window's flip() blocked. Values go into a
+    preallocated NumPy ring buffer (no allocation per frame), and whole-session
+    counters and an interval histogram are kept alongside so the end-of-session
+    report covers every frame even after the ring wraps.
+    """
+
+    def __init__(self, frame_period=1 / 60, capacity=2 ** 18, diagnostics_outlet=False):
+        self.frame_period = frame_period
+        self.capacity = capacity
+        self.frames = np.zeros((capacity, len(FRAME_FIELDS)), dtype=np.float64)
+        self.n_frames = 0
+        self.dropped = 0  # Intervals longer than 1.5 frame periods
+        self.max_interval = 0.0
+        self.interval_hist = np.zeros(HIST_MAX_MS + 1, dtype=np.int64)
+        self._last_flip_end = None
+
+        # Optional low-rate LSL stream of the same numbers while the session runs
+        self.outlet = None
+        if diagnostics_outlet:
+            info = StreamInfo('StimFrameDiagnostics', 'Diagnostics', 4, 1, 'float32', 'stimframediag')
+            channels = info.desc().append_child('channels')
+            for label in ('interval_mean_ms', 'interval_max_ms', 'draw_mean_ms', 'dropped_frames'):
+                channels.append_child('channel').append_child_value('label', label)
+            self.outlet = StreamOutlet(info)
+        self._window_start = 0  # First frame of the current diagnostics window
+        self._last_push = time.perf_counter()
+
+    def record(self, flip_start, flip_end, flip_wait1, flip_wait2):
+        """Record one frame. Times are time.perf_counter() values in seconds."""
+        if self._last_flip_end is None:
+            self._last_flip_end = flip_end  # First frame only sets the reference
+            return
+        interval = flip_end - self._last_flip_end
+        draw = flip_start - self._last_flip_end
+        self._last_flip_end = flip_end
+
+        row = self.frames[self.n_frames % self.capacity]
+        row[0] = interval
+        row[1] = draw
+        row[2] = flip_wait1
+        row[3] = flip_wait2
+        self.n_frames += 1
+
+        if interval > 1.5 * self.frame_period:
+            self.dropped += 1
+        if interval > self.max_interval:
+            self.max_interval = interval
+        self.interval_hist[min(int(interval * 1000), HIST_MAX_MS)] += 1
+
+        if self.outlet is not None and flip_end - self._last_push >= 1.0:
+            self._push_diagnostics(flip_end)
+
+    def pause(self):
+        """Forget the last flip, so the next one only sets a new reference"""
+        self._last_flip_end = None
+
+    def _push_diagnostics(self, now):
+        recent = self._recent(self.n_frames - self._window_start)
+        interval_ms = recent[:, 0] * 1000
+        dropped = np.count_nonzero(recent[:, 0] > 1.5 * self.frame_period)
+        self.outlet.push_sample([interval_ms.mean(), interval_ms.max(), recent[:, 1].mean() * 1000, dropped])
+        self._window_start = self.n_frames
+        self._last_push = now
+
+    def _recent(self, n):
+        """Return the last n frames (at most capacity) in chronological order"""
+        n = min(n, self.n_frames, self.capacity)
+        end = self.n_frames % self.capacity
+        if n <= end:
+            return self.frames[end - n:end]
+        return np.concatenate((self.frames[self.capacity - (n - end):], self.frames[:end]))
+
+    def summary(self):
+        """Return whole-session counters plus percentiles of the buffered frames"""
+        summary = {
+            'frames': self.n_frames,
+            'frame_period_ms': self.frame_period * 1000,
+            'dropped_frames': self.dropped,
+            'max_interval_ms': self.max_interval * 1000,
+            'interval_histogram_ms': {
+                (f'{i}' if i < HIST_MAX_MS else f'>={HIST_MAX_MS}'): int(count)
+                for i, count in enumerate(self.interval_hist) if count
+            },
+        }
+        recent = self._recent(self.n_frames) * 1000
+        if len(recent):
+            for i, field in enumerate(FRAME_FIELDS):
+                p50, p99 = np.percentile(recent[:, i], [50, 99])
+                summary[f'{field}_ms'] = {'mean': float(recent[:, i].mean()), 'p50': float(p50),
+                                          'p99': float(p99), 'max': float(recent[:, i].max())}
+        return summary
+
+    def write_report(self, path):
+        """Write the frame timing summary as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -1,9 +1,13 @@
 import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
-import subprocess
 import configparser
 import os
+from task_worker import TaskWorker
+
+# Worker restarts after consecutive failures before giving up; each waits twice as long
+MAX_WORKER_RESTARTS = 3
+RESTART_DELAY_MS = 1000
 
 def ensure_config_exists():
     """Create config.ini if it doesn't exist"""
@@ -79,6 +83,17 @@ class StartupGUI:
                                    wraplength=300)
         self.error_label.grid(row=4, column=0, columnspan=2)
         
+        # Live status of the task worker
+        self.status_label = ttk.Label(main_frame, text="", wraplength=300)
+        self.status_label.grid(row=5, column=0, columnspan=2)
+        
+        # Warm up the task process while the experimenter fills in the form
+        self.worker = TaskWorker()
+        self.worker.start()
+        self.restarts = 0  # Consecutive failed workers; reset once one becomes ready
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.poll_worker()
+        
         # Center the window
         self.root.update_idletasks()
         screen_width = root.winfo_screenwidth()
@@ -115,14 +130,56 @@ class StartupGUI:
         task = self.task_var.get()
         
         if task == 'rpe':
-            try:
-                # Run rpe.py using subprocess
-                subprocess.run(['python', 'rpe.py'], check=True)
-                self.root.destroy()  # Close GUI after successful task completion
-            except subprocess.CalledProcessError as e:
-                self.error_label["text"] = f"Error running task: {str(e)}"
+            # Hand the task and session metadata to the warm worker; the GUI keeps running
+            ready = self.worker.state == 'ready'
+            self.worker.dispatch(task, {'participant': self.participant_name.get().strip(),
+                                        'date': self.date_var.get().strip()})
+            self.continue_btn["state"] = "disabled"
+            if not ready:
+                self.status_label["text"] = "Task queued, waiting for the worker to finish loading..."
         else:
             self.error_label["text"] = f"Task '{task}' not yet implemented"
+    
+    def poll_worker(self):
+        """Show the worker's status messages; runs every 100 ms on the Tk event loop"""
+        for kind, payload in self.worker.poll():
+            if kind == 'status':
+                self.status_label["text"] = payload
+            elif kind == 'ready':
+                self.status_label["text"] = "Ready"
+                self.restarts = 0
+            elif kind == 'running':
+                self.status_label["text"] = f"Running {payload}..."
+            elif kind == 'done':
+                self.close()  # Close GUI after successful task completion
+                return
+            elif kind == 'error':
+                self.error_label["text"] = payload
+                self.worker.stop()
+                if self.restarts >= MAX_WORKER_RESTARTS:
+                    # Fails every time (e.g. PsychoPy not importable, no display): stop retrying
+                    self.status_label["text"] = f"Worker failed {self.restarts + 1} times; fix the error and restart the launcher."
+                    self.continue_btn["state"] = "disabled"
+                    return
+                # Start a fresh worker after a growing delay so the task can be tried again
+                delay = RESTART_DELAY_MS * 2 ** self.restarts
+                self.restarts += 1
+                self.status_label["text"] = f"Restarting worker in {delay / 1000:.0f} s..."
+                self.continue_btn["state"] = "disabled"
+                self.root.after(delay, self.restart_worker)
+                return
+        self.root.after(100, self.poll_worker)
+
+    def restart_worker(self):
+        """Start a fresh worker and resume polling it"""
+        self.worker.start()
+        self.continue_btn["state"] = "normal"
+        self.poll_worker()
+    
+    def close(self):
+        """Stop the worker and close the GUI"""
+        self.worker.stop()
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
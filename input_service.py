@@ -0,0 +1,82 @@
+import collections
+from pylsl import local_clock
+from lazy_import import LazyModule
+
+event = LazyModule('psychopy.event')
+pynput_mouse = LazyModule('pynput.mouse')  # Imported when the listener starts
+
+# One input event: kind is 'mouse' or 'key', pressed is False for button releases,
+# time is on the LSL clock
+InputEvent = collections.namedtuple('InputEvent', ['kind', 'name', 'pressed', 'time'])
+
+
+def button_names():
+    """Mouse buttons we care about, mapped to the names used by the render loops"""
+    names = {
+        pynput_mouse.Button.left: 'left',
+        pynput_mouse.Button.right: 'right',
+        pynput_mouse.Button.middle: 'middle',
+    }
+    if hasattr(pynput_mouse.Button, 'x1'):  # XButton1 is not available on every platform
+        names[pynput_mouse.Button.x1] = 'x1'
+    return names
+
+
+class InputService:
+    """Session-wide input source shared by every screen and questionnaire page.
+
+    A single pynput listener thread runs for the whole session and appends every
+    button press and release to a queue, so a click whose press and release both
+    happen between two frames is still seen. The render loop calls poll() once per
+    frame to drain the queue, together with any PsychoPy key presses.
+
+    Button events are stamped on the LSL clock inside the listener thread, at the
+    moment the button changed state, not when the render loop gets to them. Key
+    presses are stamped when they are polled.
+    """
+
+    def __init__(self, clock=local_clock):
+        self.clock = clock
+        self._queue = collections.deque()
+        self._listener = None
+        self._button_names = {}
+
+    def start(self):
+        """Start the mouse listener thread (once per session)"""
+        if self._listener is None:
+            self._button_names = button_names()
+            self._listener = pynput_mouse.Listener(on_click=self._on_click)
+            self._listener.start()
+
+    def stop(self):
+        """Stop the mouse listener thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _on_click(self, x, y, button, pressed):
+        # Runs on the listener thread: only timestamp and queue the event
+        timestamp = self.clock()
+        name = self._button_names.get(button)
+        if name is not None:
+            self._queue.append(InputEvent('mouse', name, pressed, timestamp))
+
+    def poll(self):
+        """Return all input events since the last poll, oldest first"""
+        events = []
+        try:
+            while True:
+                events.append(self._queue.popleft())
+        except IndexError:
+            pass
+        keys = event.getKeys()
+        if keys:
+            timestamp = self.clock()
+            for key in keys:
+                events.append(InputEvent('key', key, True, timestamp))
+        return events
+
+    def clear(self):
+        """Discard any pending events (e.g. when a new page is shown)"""
+        self._queue.clear()
+        event.clearEvents('keyboard')
@@ -0,0 +1,49 @@
+import statistics
+
+
+class ClickToPhotonTracker:
+    """Measure the time from a participant's button press to the first frame showing it.
+
+    run_rpe reports each button press with its capture time (LSL clock, stamped in the
+    input listener thread) and, after the next flip, the LSL time at which win1's flip
+    returned. Because input is applied before the frame is drawn, that flip is the first
+    one that reflects the press. The result is click-to-flip latency; display scan-out
+    and panel response come on top and need a photodiode to measure.
+    """
+
+    def __init__(self):
+        self.pending = []  # (button, press time) waiting for the next flip
+        self.deltas = []
+
+    def reset(self):
+        self.pending = []
+        self.deltas = []
+
+    def pressed(self, button, press_time):
+        self.pending.append((button, press_time))
+
+    def discard(self):
+        """Drop pending presses whose frame was never drawn (e.g. the press that left a page)"""
+        self.pending = []
+
+    def flipped(self, flip_time):
+        """Resolve pending presses against a flip and return [(button, press time, delta)]"""
+        if not self.pending or flip_time is None:
+            return []
+        resolved = [(button, press_time, flip_time - press_time) for button, press_time in self.pending]
+        self.deltas.extend(delta for _, _, delta in resolved)
+        self.pending = []
+        return resolved
+
+    def summary(self):
+        """Latency statistics in milliseconds"""
+        if not self.deltas:
+            return {'n': 0}
+        deltas = sorted(1000 * delta for delta in self.deltas)
+        return {
+            'n': len(deltas),
+            'mean_ms': statistics.fmean(deltas),
+            'p50_ms': deltas[len(deltas) // 2],
+            'p95_ms': deltas[min(len(deltas) - 1, int(len(deltas) * 0.95))],
+            'max_ms': deltas[-1],
+        }
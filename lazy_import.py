@@ -0,0 +1,33 @@
+import importlib
+
+
+class LazyModule:
+    """A module that is imported on first attribute access instead of at import time.
+
+    PsychoPy and pynput take seconds to import and open display connections, so the
+    task modules bind them lazily:
+
+        visual = LazyModule('psychopy.visual')
+
+    and `visual.Window(...)` imports psychopy.visual the first time it runs. Importing
+    a task module (e.g. `from rpe_key import run_rpe`, or `--help`) stays cheap, and the
+    caller decides when and on which thread the heavy import happens, e.g. with load().
+    Stand-ins already in sys.modules (see simulation.install) are picked up as usual.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        """Import the module now (if not done yet) and return it"""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
@@ -0,0 +1,47 @@
+import csv
+import time
+from pylsl import local_clock
+
+
+class ClockService:
+    """Single time base for every marker: the LSL clock.
+
+    now() reads pylsl.local_clock() once per event; that value is passed explicitly
+    to the outlet and written to the local log, so the CSV and the XDF recording carry
+    the same timestamp. Every `offset_interval` seconds a (local_clock, time.time())
+    pair is added to an offset table, from which wall-clock times are derived and
+    both time bases can be reconstructed afterwards.
+    """
+
+    def __init__(self, offset_interval=60.0):
+        self.offset_interval = offset_interval
+        self.offsets = []  # (lsl_time, wall_time) pairs
+        self._offset = 0.0  # wall_time - lsl_time from the latest pair
+        self.record_offset()
+
+    def record_offset(self):
+        """Add a (local_clock, time.time()) pair to the offset table"""
+        before = local_clock()
+        wall = time.time()
+        after = local_clock()
+        lsl = (before + after) / 2  # Bracket the wall-clock read to halve the error
+        self.offsets.append((lsl, wall))
+        self._offset = wall - lsl
+
+    def now(self):
+        """Return the current LSL time, refreshing the offset table when it is due"""
+        t = local_clock()
+        if t - self.offsets[-1][0] >= self.offset_interval:
+            self.record_offset()
+        return t
+
+    def to_wall(self, lsl_time):
+        """Convert an LSL time to wall-clock (time.time()) time using the latest offset"""
+        return lsl_time + self._offset
+
+    def write_offsets(self, path):
+        """Write the offset table as CSV"""
+        with open(path, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['LSLTimestamp', 'Timestamp'])
+            writer.writerows(self.offsets)
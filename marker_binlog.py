@@ -0,0 +1,139 @@
+import argparse
+import csv
+import os
+import re
+import numpy as np
+
+# File layout: an 8-byte magic followed by fixed-width little-endian records.
+# Marker names live in a sidecar string table (<log>.strings, one entry per line,
+# line number == event code), appended to as new markers appear.
+MAGIC = b'VO2MRK01'
+HEADER_SIZE = len(MAGIC)
+RECORD_DTYPE = np.dtype([
+    ('code', '<i4'),        # Index into the string table
+    ('lsl_time', '<f8'),    # LSL local_clock() timestamp (NaN if unknown)
+    ('wall_time', '<f8'),   # time.time() timestamp
+    ('value', '<i4'),       # Numeric payload, NO_VALUE if the marker has none
+])
+NO_VALUE = np.iinfo(np.int32).min
+
+# Markers such as 'affect_Response: 5' or 'rpe_assessment: 120s' carry a number after
+# a colon; it is stored as the value and the string table keeps a '{}' template
+VALUE_PATTERN = re.compile(r'^(.*: )(-?\d+)(s?)$')
+
+
+def strings_path(path):
+    """Return the path of the string table belonging to a binary log"""
+    return path + '.strings'
+
+
+def split_marker(marker):
+    """Split a marker string into (template, value)"""
+    match = VALUE_PATTERN.match(marker)
+    if match is None:
+        return marker, NO_VALUE
+    prefix, number, suffix = match.groups()
+    value = int(number)
+    if not NO_VALUE < value <= np.iinfo(np.int32).max:
+        return marker, NO_VALUE  # Out of int32 range, keep it as a plain string
+    return prefix + '{}' + suffix, value
+
+
+def join_marker(template, value):
+    """Inverse of split_marker"""
+    if value == NO_VALUE:
+        return template
+    return template.replace('{}', str(value), 1)
+
+
+class BinarySink:
+    """Marker log sink writing fixed-width binary records (used by marker_log.MarkerWriter)
+
+    With an event_codes.Codebook the string table starts with the codebook's names, so
+    [code, wall, lsl, value] rows from event-code mode are written without lookups.
+    """
+
+    def __init__(self, filename, codebook=None):
+        self.filename = filename
+        self.codes = {}
+        self._file = open(self.filename, mode='wb')
+        self._file.write(MAGIC)
+        self._strings = open(strings_path(self.filename), mode='w', encoding='utf-8')
+        for name in (codebook.names if codebook is not None else ()):
+            self._code(name)
+
+    def _code(self, template):
+        code = self.codes.get(template)
+        if code is None:
+            code = len(self.codes)
+            self.codes[template] = code
+            self._strings.write(template.replace('\n', ' ') + '\n')
+        return code
+
+    def write_rows(self, items):
+        records = np.empty(len(items), dtype=RECORD_DTYPE)
+        for i, (row, lsl_time) in enumerate(items):
+            if isinstance(row[0], int):
+                records[i] = (row[0], lsl_time, float(row[1]), row[3])  # Already an event code
+                continue
+            template, value = split_marker(str(row[0]))
+            records[i] = (self._code(template), lsl_time, float(row[1]), value)
+        self._file.write(records.tobytes())
+
+    def flush(self, fsync=True):
+        # String table first, so every code on disk has its name on disk too
+        self._strings.flush()
+        self._file.flush()
+        if fsync:
+            os.fsync(self._strings.fileno())
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._strings.close()
+        self._file.close()
+
+
+def read_binlog(path):
+    """Memory-map a binary marker log.
+
+    Returns:
+        tuple: (records, strings) where records is a read-only structured array with
+        RECORD_DTYPE fields and strings is the list of marker templates indexed by code
+    """
+    with open(path, 'rb') as f:
+        if f.read(HEADER_SIZE) != MAGIC:
+            raise ValueError(f"{path} is not a binary marker log")
+    with open(strings_path(path), encoding='utf-8') as f:
+        strings = f.read().splitlines()
+
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if n_records == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE), strings  # np.memmap cannot map zero bytes
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+    return records, strings
+
+
+def export_csv(path, csv_path):
+    """Write a binary marker log back out in the StimMarkersAlpha,Timestamp,LSLTimestamp CSV format"""
+    records, strings = read_binlog(path)
+    with open(csv_path, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['StimMarkersAlpha', 'Timestamp', 'LSLTimestamp'])
+        for code, value, wall_time, lsl_time in zip(records['code'].tolist(), records['value'].tolist(),
+                                                    records['wall_time'].tolist(), records['lsl_time'].tolist()):
+            writer.writerow([join_marker(strings[code], value), wall_time, lsl_time])
+
+
+def main():
+    """Export a binary marker log to CSV"""
+    parser = argparse.ArgumentParser(description='Export a binary marker log to CSV')
+    parser.add_argument('binlog', help='Binary marker log (.bin)')
+    parser.add_argument('csv', nargs='?', help='Output CSV (default: same name with .csv)')
+    args = parser.parse_args()
+
+    csv_path = args.csv or os.path.splitext(args.binlog)[0] + '.csv'
+    export_csv(args.binlog, csv_path)
+    print(f"Wrote {csv_path}")
+
+if __name__ == "__main__":
+    main()
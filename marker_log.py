@@ -0,0 +1,167 @@
+import collections
+import csv
+import os
+import threading
+import time
+
+
+class CsvSink:
+    """Marker log sink writing plain CSV rows"""
+
+    def __init__(self, filename, header=None):
+        self.filename = filename
+        self._file = open(self.filename, mode='w', newline='')
+        self._writer = csv.writer(self._file)
+        if header:
+            self._writer.writerow(header)
+
+    def write_rows(self, items):
+        self._writer.writerows(row for row, _ in items)
+
+    def flush(self, fsync=True):
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class MarkerWriter:
+    """Write marker rows to disk from a background thread.
+
+    The render loop only appends rows to a deque (append/popleft are atomic, so no lock
+    is taken on the hot path). A logger thread wakes every `flush_interval` seconds,
+    writes everything queued as one batch, flushes and optionally fsyncs the file, so a
+    crash loses at most one flush window of rows.
+
+    Rows are handed to a sink (CsvSink, or BinarySink from marker_binlog) which does
+    the actual encoding, so formatting also stays off the render thread.
+
+    A failed write or fsync never reaches the render loop: the rows go back on the
+    queue and are retried at the next flush, the first failure is printed once and the
+    latest error and failure count are kept in stats(). While the disk is failing,
+    rows are buffered up to `max_queue`; beyond that, new rows are dropped (and
+    counted) rather than blocking the draw loop on a writer that cannot make room.
+    """
+
+    def __init__(self, sink, flush_interval=0.5, fsync=True, max_queue=10000):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_queue = max_queue
+
+        self._queue = collections.deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        # Backpressure and throughput metrics
+        self.enqueued = 0
+        self.written = 0
+        self.flushes = 0
+        self.high_water = 0
+        self.full_waits = 0
+        self.full_wait_time = 0.0
+
+        self._closed = False
+        self.error = None  # Latest write/fsync error, if any
+        self.write_errors = 0
+        self.dropped = 0  # Rows refused because the queue was full while writes were failing
+        self._failing = False  # The last flush failed; cleared by the next successful one
+
+        self._thread = threading.Thread(target=self._run, name='MarkerWriter', daemon=True)
+        self._thread.start()
+
+    def write(self, row, lsl_time=float('nan')):
+        """Queue a row for writing. Blocks briefly only if the queue is full."""
+        if len(self._queue) >= self.max_queue:
+            if self._failing:
+                self.dropped += 1  # The writer cannot make room; don't stall the frame
+                return
+            self._wait_for_room(1)
+        self._queue.append((row, lsl_time))
+        self.enqueued += 1
+        self._check_depth()
+
+    def _wait_for_room(self, n):
+        # Queue full: wake the writer and wait for it to make room instead of dropping markers
+        self.full_waits += 1
+        wait_start = time.perf_counter()
+        self._wake.set()
+        while (len(self._queue) + n > self.max_queue and len(self._queue) and self._thread.is_alive()
+               and not self._failing):
+            time.sleep(0.001)
+        self.full_wait_time += time.perf_counter() - wait_start
+
+    def _check_depth(self):
+        depth = len(self._queue)
+        if depth > self.high_water:
+            self.high_water = depth
+        if depth >= self.max_queue // 2:
+            self._wake.set()  # Flush early rather than letting the queue fill up
+
+    def _drain(self):
+        """Write all queued rows as one batch and commit them to disk"""
+        rows = []
+        try:
+            while True:
+                rows.append(self._queue.popleft())
+        except IndexError:
+            pass
+        if not rows:
+            return
+        try:
+            self.sink.write_rows(rows)
+            self.sink.flush(self.fsync)
+        except Exception:
+            self._queue.extendleft(reversed(rows))  # Keep them pending (and counted in stats)
+            raise
+        self.written += len(rows)
+        self.flushes += 1
+        self._failing = False
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                self._record_error(e)  # Retried at the next flush
+
+    def _record_error(self, error):
+        self.error = error
+        self.write_errors += 1
+        self._failing = True
+        if self.write_errors == 1:
+            print(f"Warning: marker log write failed ({error!r}); rows are kept in memory and retried")
+
+    def stats(self):
+        """Return the writer's queue and throughput metrics"""
+        return {
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'pending': len(self._queue),
+            'flushes': self.flushes,
+            'high_water': self.high_water,
+            'full_waits': self.full_waits,
+            'full_wait_time': self.full_wait_time,
+            'write_errors': self.write_errors,
+            'dropped': self.dropped,
+            'error': repr(self.error) if self.error is not None else None,
+        }
+
+    def close(self):
+        """Stop the logger thread, write any remaining rows and close the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        try:
+            self._drain()
+        except Exception as e:
+            self._record_error(e)
+        finally:
+            self.sink.close()
@@ -0,0 +1,189 @@
+import threading
+import time
+import numpy as np
+from pylsl import StreamInlet, resolve_byprop, proc_clocksync, local_clock
+
+# One physiological sample: LSL time (on the local clock) and the channel value
+PHYSIO_DTYPE = np.dtype([('time', '<f8'), ('value', '<f4')])
+
+# Ring size for streams with an irregular rate (nominal_srate 0), e.g. beat-to-beat heart rate
+DEFAULT_CAPACITY = 2 ** 14
+# Buffers hold this many rolling windows, so a window is complete even if the thread is late
+WINDOW_HEADROOM = 2
+
+
+class PhysioBuffer:
+    """Fixed-size ring buffer of (time, value) samples with rolling statistics.
+
+    The buffer is allocated once, so memory stays the same however long the session
+    runs; the oldest samples are overwritten. A single writer thread calls extend();
+    readers use n_samples, which is only advanced after the rows are written (as in
+    PointerSampler). Statistics are computed over the `seconds` before a given time
+    with vectorized NumPy, so they cost the same at 1 Hz or 1 kHz; a stream that has
+    sent nothing in that window has no statistics rather than stale ones.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.samples = np.zeros(capacity, dtype=PHYSIO_DTYPE)
+        self.n_samples = 0
+
+    def extend(self, times, values):
+        """Append a chunk of samples (arrays of equal length)"""
+        n = len(times)
+        if n == 0:
+            return
+        skipped = max(n - self.capacity, 0)  # A chunk larger than the ring only keeps its newest samples
+        times, values = times[skipped:], values[skipped:]
+        start = (self.n_samples + skipped) % self.capacity
+        first = min(len(times), self.capacity - start)
+        self.samples['time'][start:start + first] = times[:first]
+        self.samples['value'][start:start + first] = values[:first]
+        rest = len(times) - first
+        if rest:
+            self.samples['time'][:rest] = times[first:]
+            self.samples['value'][:rest] = values[first:]
+        self.n_samples += n  # Published only after the rows are written
+
+    def recent(self, seconds, now):
+        """Return the samples from `now - seconds` on, oldest first"""
+        n = self.n_samples
+        if n == 0:
+            return self.samples[:0]
+        end = n % self.capacity
+        if n <= self.capacity:
+            samples = self.samples[:n]
+        else:
+            samples = np.concatenate((self.samples[end:], self.samples[:end]))
+        first = np.searchsorted(samples['time'], now - seconds, side='left')
+        return samples[first:]
+
+    def rolling(self, seconds, now):
+        """Latest value, mean and least-squares slope (per minute) over the `seconds` before
+        `now` (LSL time), or None if no valid sample arrived in that window"""
+        samples = self.recent(seconds, now)
+        valid = np.isfinite(samples['value'])
+        if not valid.any():
+            return None
+        times = samples['time'][valid]
+        values = samples['value'][valid].astype(np.float64)
+        mean = values.mean()
+        dt = times - times.mean()
+        spread = np.dot(dt, dt)
+        slope = np.dot(dt, values - mean) / spread if spread > 0 else 0.0
+        return {'value': float(values[-1]), 'mean': float(mean), 'slope_per_min': float(slope * 60),
+                'n': int(len(values)), 'time': float(times[-1])}
+
+
+class PhysioMonitor:
+    """Subscribe to physiological LSL streams (e.g. heart rate and VO2) on a background thread.
+
+    `streams` maps a short label to an LSL stream name, e.g. {'hr': 'HeartRate',
+    'vo2': 'VO2'}. The thread resolves each stream by name (retrying until it appears,
+    so a device started late is still picked up), pulls chunks from every inlet and
+    appends one channel of each to its PhysioBuffer. Timestamps are converted to the
+    local LSL clock, so they line up with the marker log. The render loop only calls
+    stats() or text(), which read the buffers without blocking.
+
+    Each buffer is sized when its stream connects, to WINDOW_HEADROOM rolling windows
+    at the stream's nominal rate (DEFAULT_CAPACITY for irregular streams). A fixed
+    `capacity` can be given instead; a warning is printed if it holds less than that.
+    """
+
+    def __init__(self, streams, window=10.0, capacity=None, channel=0, poll_interval=0.05,
+                 resolve_interval=5.0, max_buflen=30, clock=local_clock):
+        self.streams = dict(streams)
+        self.window = window
+        self.capacity = capacity
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.resolve_interval = resolve_interval
+        self.max_buflen = max_buflen  # Seconds liblsl queues for us if the thread falls behind
+        self.clock = clock
+        self.buffers = {label: PhysioBuffer(capacity or DEFAULT_CAPACITY) for label in self.streams}
+        self.inlets = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the subscription thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='PhysioMonitor', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the subscription thread and close the inlets"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        for inlet in self.inlets.values():
+            inlet.close_stream()
+        self.inlets = {}
+
+    def _resolve(self):
+        """Open an inlet for every stream that is not connected yet"""
+        for label, name in self.streams.items():
+            if label not in self.inlets:
+                found = resolve_byprop('name', name, minimum=1, timeout=0.5)
+                if found:
+                    # Replaced before the inlet exists, so the old (empty) buffer is never written
+                    self.buffers[label] = PhysioBuffer(self._capacity(label, found[0].nominal_srate()))
+                    self.inlets[label] = StreamInlet(found[0], max_buflen=self.max_buflen,
+                                                     processing_flags=proc_clocksync)
+
+    def _capacity(self, label, rate):
+        """Samples to buffer for a stream with nominal rate `rate` (0 if irregular)"""
+        needed = int(np.ceil(rate * self.window * WINDOW_HEADROOM))
+        if self.capacity is None:
+            return max(needed, DEFAULT_CAPACITY) if rate > 0 else DEFAULT_CAPACITY
+        if needed > self.capacity:
+            print(f"Warning: {label} stream at {rate:g} Hz needs {needed} samples for a "
+                  f"{self.window:g} s window, but the buffer holds {self.capacity}; "
+                  "its statistics only cover the newest samples")
+        return self.capacity
+
+    def _pull(self):
+        """Move everything queued on the inlets into the buffers"""
+        for label, inlet in self.inlets.items():
+            while True:
+                samples, timestamps = inlet.pull_chunk(timeout=0.0, max_samples=1024)
+                if timestamps:
+                    values = np.asarray(samples, dtype=np.float64)[:, self.channel]
+                    self.buffers[label].extend(np.asarray(timestamps, dtype=np.float64), values)
+                if len(timestamps) < 1024:
+                    break
+
+    def _run(self):
+        next_resolve = time.perf_counter()
+        while not self._stop.is_set():
+            if len(self.inlets) < len(self.streams) and time.perf_counter() >= next_resolve:
+                self._resolve()
+                next_resolve = time.perf_counter() + self.resolve_interval
+            self._pull()
+            time.sleep(self.poll_interval)
+
+    def stats(self, now=None):
+        """Return {label: statistics over the window ending at `now` (default: the current
+        LSL time), see PhysioBuffer.rolling; None for a stream with no samples in it}"""
+        now = self.clock() if now is None else now
+        return {label: buffer.rolling(self.window, now) for label, buffer in self.buffers.items()}
+
+    def text(self):
+        """One line for the experimenter screen, e.g. 'HR 142.3 (+2.1/min)   VO2 2.8 (+0.1/min)'"""
+        parts = []
+        for label, stats in self.stats().items():
+            if label not in self.inlets:
+                parts.append(f"{label.upper()} not connected")
+            elif stats is None:
+                parts.append(f"{label.upper()} --")  # Nothing received within the window
+            else:
+                parts.append(f"{label.upper()} {stats['mean']:.1f} ({stats['slope_per_min']:+.1f}/min)")
+        return '   '.join(parts)
+
+    def report(self):
+        """Connection state and samples received per stream"""
+        return {label: {'stream': self.streams[label], 'connected': label in self.inlets,
+                        'samples': buffer.n_samples}
+                for label, buffer in self.buffers.items()}
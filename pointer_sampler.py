@@ -0,0 +1,99 @@
+import threading
+import time
+import numpy as np
+from pylsl import local_clock
+from lazy_import import LazyModule
+
+pynput_mouse = LazyModule('pynput.mouse')
+
+# One pointer sample: LSL time, position in window 'height' units, question index
+SAMPLE_DTYPE = np.dtype([('time', '<f8'), ('x', '<f4'), ('y', '<f4'), ('question', '<i4')])
+
+
+class PointerSampler:
+    """Sample the pointer at a fixed rate on a background thread, independent of flips.
+
+    The pointer is read from the OS through pynput, so a sample does not depend on
+    the window's event loop having run. Samples go into a preallocated NumPy ring
+    buffer, and the whole trajectory is available afterwards from trajectory() or
+    export(). Positions are converted to the window's 'height' units, with (0, 0) at
+    the window centre, from the window's position and size. That conversion is only
+    approximate on HiDPI displays (where OS and window pixels differ) and after the
+    window is moved, so it is used for the trajectory only; the value shown and
+    recorded comes from the window's own mouse position.
+
+    `question` is stamped on every sample, so the trajectory can be split per page.
+    """
+
+    def __init__(self, win, rate=1000.0, capacity=2 ** 20, clock=local_clock):
+        self.win = win
+        self.period = 1 / rate
+        self.capacity = capacity
+        self.clock = clock
+        self.samples = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        self.n_samples = 0
+        self.question = -1  # Set by the render loop when a page is shown
+        self._controller = pynput_mouse.Controller()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _to_window_units(self, px, py):
+        """Screen pixels to 'height' units relative to the window centre"""
+        left, top = getattr(self.win, 'pos', None) or (0, 0)
+        width, height = self.win.size
+        return (px - left - width / 2) / height, (top + height / 2 - py) / height
+
+    def start(self):
+        """Start the sampler thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='PointerSampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sampler thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            px, py = self._controller.position
+            row = self.samples[self.n_samples % self.capacity]
+            row['time'] = self.clock()
+            row['x'], row['y'] = self._to_window_units(px, py)
+            row['question'] = self.question
+            self.n_samples += 1  # Published only after the row is complete
+
+            next_sample += self.period
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.perf_counter()  # Fell behind: don't try to catch up in a burst
+
+    def latest(self):
+        """Return the most recent (x, y), or None before the first sample"""
+        n = self.n_samples
+        if n == 0:
+            return None
+        row = self.samples[(n - 1) % self.capacity]
+        return float(row['x']), float(row['y'])
+
+    def trajectory(self):
+        """Return the buffered samples (at most capacity) in chronological order"""
+        n = self.n_samples
+        end = n % self.capacity
+        if n <= self.capacity:
+            return self.samples[:n].copy()
+        return np.concatenate((self.samples[end:], self.samples[:end]))
+
+    def export(self, path):
+        """Write the buffered trajectory as CSV"""
+        samples = self.trajectory()
+        np.savetxt(path, np.column_stack([samples[name] for name in SAMPLE_DTYPE.names]),
+                   fmt=['%.6f', '%.5f', '%.5f', '%d'], delimiter=',', header=','.join(SAMPLE_DTYPE.names),
+                   comments='')
+        return len(samples)
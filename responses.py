@@ -0,0 +1,72 @@
+import csv
+import numpy as np
+
+# One confirmed answer. Times are on the LSL clock: event_time is the button press that
+# selected the value, confirm_time the space press that confirmed it.
+RESPONSE_DTYPE = np.dtype([
+    ('assessment', '<i2'),
+    ('question', '<i2'),     # Index into ResponseStore.questions
+    ('value', '<i4'),
+    ('event_time', '<f8'),
+    ('confirm_time', '<f8'),
+])
+
+
+class ResponseStore:
+    """Confirmed questionnaire answers of a whole session in one NumPy structured array.
+
+    ExperimentFlow creates one store and passes it to every run_rpe call; each call
+    opens a new assessment and appends a record per confirmed answer. The array grows
+    by doubling, so appending does not allocate per answer. Answers can be queried
+    while the session runs (e.g. latest('arousal')) and are written in one go at the end.
+    """
+
+    def __init__(self, questions, capacity=256):
+        self.questions = list(questions)
+        self.question_ids = {question: i for i, question in enumerate(self.questions)}
+        self._records = np.zeros(capacity, dtype=RESPONSE_DTYPE)
+        self.n_records = 0
+        self.n_assessments = 0
+
+    def new_assessment(self):
+        """Start the next assessment and return its index"""
+        self.n_assessments += 1
+        return self.n_assessments - 1
+
+    def add(self, assessment, question, value, event_time, confirm_time):
+        """Append a confirmed answer; question is a key such as 'affect'"""
+        if self.n_records == len(self._records):
+            self._records = np.concatenate((self._records, np.zeros_like(self._records)))
+        self._records[self.n_records] = (assessment, self.question_ids[question], value, event_time, confirm_time)
+        self.n_records += 1
+
+    @property
+    def records(self):
+        """View of the stored records, oldest first"""
+        return self._records[:self.n_records]
+
+    def latest(self, question, assessment=None):
+        """Return the last confirmed value for a question (optionally within one assessment), or None"""
+        records = self.records
+        mask = records['question'] == self.question_ids[question]
+        if assessment is not None:
+            mask &= records['assessment'] == assessment
+        matches = np.flatnonzero(mask)
+        return int(records['value'][matches[-1]]) if len(matches) else None
+
+    def assessment(self, index):
+        """Return {question: value} of one assessment, the last answer winning after a regress"""
+        records = self.records[self.records['assessment'] == index]
+        return {self.questions[question]: value
+                for question, value in zip(records['question'].tolist(), records['value'].tolist())}
+
+    def write(self, path):
+        """Write all records as CSV in a single pass"""
+        records = self.records
+        with open(path, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Assessment', 'Question', 'Value', 'EventLSLTimestamp', 'ConfirmLSLTimestamp'])
+            writer.writerows(zip(records['assessment'].tolist(),
+                                 [self.questions[question] for question in records['question'].tolist()],
+                                 records['value'].tolist(), records['event_time'].tolist(),
+                                 records['confirm_time'].tolist()))
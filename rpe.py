@@ -1,16 +1,48 @@
 import argparse
-from psychopy import visual, core, event
 import numpy as np
+from lazy_import import LazyModule
+from pointer_sampler import PointerSampler
+from slider_stream import SliderStream
+
+# Imported on first use, so the task worker can import this module before creating its window
+visual = LazyModule('psychopy.visual')
+core = LazyModule('psychopy.core')
+event = LazyModule('psychopy.event')
+
+def build_parser():
+    """Command-line options of the rating task"""
+    parser = argparse.ArgumentParser(description='RPE Rating Task')
+    parser.add_argument('--continuous', 
+                       action='store_true',
+                       help='Allow continuous values. If not set, only discrete values from the tick marks are allowed.')
+    parser.add_argument('--full',
+                       action='store_true',
+                       help='Show all questions. If not set, only shows RPE and Arousal questions.')
+    parser.add_argument('--sample-rate',
+                       type=float,
+                       default=1000,
+                       help='Pointer samples per second, independent of the frame rate.')
+    parser.add_argument('--trajectory',
+                       type=str,
+                       default=None,
+                       help='Write the full pointer trajectory (time, x, y, question) to this CSV file.')
+    parser.add_argument('--lsl-stream',
+                       action='store_true',
+                       help='Stream the hovered slider value and question index on a float32 LSL stream.')
+    parser.add_argument('--stream-rate',
+                       type=float,
+                       default=100,
+                       help='Nominal sampling rate of the --lsl-stream outlet.')
+    parser.add_argument('--participant',
+                       type=str,
+                       default=None,
+                       help='Participant name, printed and added to the --lsl-stream description.')
+    parser.add_argument('--date',
+                       type=str,
+                       default=None,
+                       help='Session date, printed and added to the --lsl-stream description.')
+    return parser
 
-# Add argument parser
-parser = argparse.ArgumentParser(description='RPE Rating Task')
-parser.add_argument('--continuous', 
-                   action='store_true',
-                   help='Allow continuous values. If not set, only discrete values from the tick marks are allowed.')
-parser.add_argument('--full',
-                   action='store_true',
-                   help='Show all questions. If not set, only shows RPE and Arousal questions.')
-args = parser.parse_args()
 
 rpe_dict = {-5:'Very Bad', -4:'', -3:'Bad', -2:'', -1:'Fairly Bad', 0:'', 
             1:'Fairly Good', 2:'', 3:'Good', 4:'', 5:'Very Good'}
@@ -34,7 +66,7 @@ titles = {'RPE':
              ]]
           }
 
-def create_page(win, title, subtitle, value_dict):
+def create_page(win, title, subtitle, value_dict, continuous=False):
     """Create a page with title, subtitle, and slider based on the value dictionary"""
     # Create title text
     title_text = visual.TextStim(
@@ -61,7 +93,7 @@ def create_page(win, title, subtitle, value_dict):
         units='height',
         ticks=sorted(list(value_dict.keys())),  # Use dictionary keys as tick marks
         labels=None,
-        granularity=0.1 if args.continuous else 1.0,
+        granularity=0.1 if continuous else 1.0,
         style='rating',
         color='white',
         fillColor='red',
@@ -113,97 +145,150 @@ def create_page(win, title, subtitle, value_dict):
     
     return title_text, subtitle_text, slider, tick_labels, value_display, response_display, cursor_dot
 
-# Create window
-win = visual.Window(
-    size=(1024, 768),
-    units='height',
-    fullscr=False,
-    color='gray'
-)
-
-# Initialize dictionary to store all responses
-all_responses = {}
-
-# Loop through each title and its pages
-i = 0
-for title, (value_dict, subtitles) in titles.items():
-    # Skip agreement questions if --full is not set
-    if not args.full and title == 'Please indicate how much you agree with the following statements':
-        continue
-        
-    for subtitle in subtitles:
-        # Create page elements
-        title_text, subtitle_text, slider, tick_labels, value_display, response_display, cursor_dot = create_page(
-            win, title, subtitle, value_dict
+def slider_cursor_x(slider, x):
+    """Clamp a horizontal pointer position to the slider's extent"""
+    slider_left = slider.pos[0] - slider.size[0]/2
+    return min(max(x, slider_left), slider_left + slider.size[0])
+
+def slider_value(slider, x, continuous=False):
+    """Convert a horizontal pointer position to the slider value under it (shown and streamed)"""
+    slider_left = slider.pos[0] - slider.size[0]/2
+    normalized_pos = (slider_cursor_x(slider, x) - slider_left) / slider.size[0]
+    value = slider.ticks[0] + normalized_pos * (slider.ticks[-1] - slider.ticks[0])
+    return value if continuous else round(value)
+
+def run_task(args, win=None):
+    """Run the rating task and return {question: response}, or None if it was quit
+
+    Args:
+        args: options from build_parser()
+        win: window to draw in. If None, one is created (and closed at the end)
+    """
+    # Session metadata passed on from the launcher
+    metadata = {key: value for key, value in (('participant', args.participant), ('date', args.date)) if value}
+    if metadata:
+        print(f"Session: {metadata}")
+
+    # Create window unless a pre-created one is passed in (see task_worker.py)
+    if win is None:
+        win = visual.Window(
+            size=(1024, 768),
+            units='height',
+            fullscr=False,
+            color='gray'
         )
+
+    # Sample the pointer trajectory on a background thread. The value drawn and recorded each
+    # frame comes from PsychoPy's own mouse position, which is already in window units
+    sampler = PointerSampler(win, rate=args.sample_rate)
+    sampler.start()
+    mouse = event.Mouse(visible=False)  # Hide default cursor
+
+    # Optional LSL stream of the hovered value, pushed in chunks at a fixed rate
+    stream = None
+    if args.lsl_stream:
+        stream = SliderStream(rate=args.stream_rate, metadata=metadata)
+        stream.start()
+
+    def save_trajectory():
+        """Stop the pointer sampler (and LSL stream) and export the trajectory if requested"""
+        if stream is not None:
+            stream.stop()
+        sampler.stop()
+        if args.trajectory:
+            n = sampler.export(args.trajectory)
+            print(f"Wrote {n} pointer samples to {args.trajectory}")
+
+    # Initialize dictionary to store all responses
+    all_responses = {}
+
+    # Loop through each title and its pages
+    i = 0
+    for title, (value_dict, subtitles) in titles.items():
+        # Skip agreement questions if --full is not set
+        if not args.full and title == 'Please indicate how much you agree with the following statements':
+            continue
         
-        response = None
-        while True:
-            mouse = event.Mouse(visible=False)  # Hide default cursor
-            
-            # Get mouse position and convert to slider value
-            mouse_x = mouse.getPos()[0]
-            slider_left = slider.pos[0] - slider.size[0]/2
-            slider_right = slider.pos[0] + slider.size[0]/2
+        for subtitle in subtitles:
+            # Create page elements
+            title_text, subtitle_text, slider, tick_labels, value_display, response_display, cursor_dot = create_page(
+                win, title, subtitle, value_dict, args.continuous
+            )
+        
+            response = None
+            sampler.question = i  # Tag the trajectory samples with this question
+            if stream is not None:
+                stream.value = None  # Nothing streamed until this page's first frame
+                stream.question = i
+            while True:
+                # Get mouse position and convert to slider value
+                mouse_x = mouse.getPos()[0]
             
-            # Calculate cursor position and value
-            cursor_x = min(max(mouse_x, slider_left), slider_right)
-            normalized_pos = (cursor_x - slider_left) / slider.size[0]
-            hover_value = slider.ticks[0] + normalized_pos * (slider.ticks[-1] - slider.ticks[0])
+                # Calculate cursor position and value
+                cursor_x = slider_cursor_x(slider, mouse_x)
+                hover_value = slider_value(slider, mouse_x, args.continuous)
+                if stream is not None:
+                    stream.value = hover_value  # Streamed value is the one on screen
             
-            # Update cursor dot position
-            cursor_dot.pos = (cursor_x, slider.pos[1])
+                # Update cursor dot position
+                cursor_dot.pos = (cursor_x, slider.pos[1])
             
-            # Round the hover value if not continuous
-            if not args.continuous and hover_value is not None:
-                hover_value = round(hover_value)
+                # Handle mouse click for recording response
+                if mouse.getPressed()[0]:
+                    if hover_value is not None:
+                        slider.rating = hover_value
+                        response = hover_value
+                        if args.continuous:
+                            response_display.text = f'Response recorded: {response:.1f}'
+                        else:
+                            response_display.text = f'Response recorded: {int(response)}'
             
-            # Handle mouse click for recording response
-            if mouse.getPressed()[0]:
+                # Update value display
                 if hover_value is not None:
-                    slider.rating = hover_value
-                    response = hover_value
                     if args.continuous:
-                        response_display.text = f'Response recorded: {response:.1f}'
+                        value_display.text = f'Current value: {hover_value:.1f}'
                     else:
-                        response_display.text = f'Response recorded: {int(response)}'
+                        value_display.text = f'Current value: {int(hover_value)}'
             
-            # Update value display
-            if hover_value is not None:
-                if args.continuous:
-                    value_display.text = f'Current value: {hover_value:.1f}'
-                else:
-                    value_display.text = f'Current value: {int(hover_value)}'
+                # Draw everything
+                title_text.draw()
+                subtitle_text.draw()
+                slider.draw()
+                for label in tick_labels:
+                    label.draw()
+                value_display.draw()
+                response_display.draw()
+                cursor_dot.draw()  # Draw the cursor dot
+                win.flip()
             
-            # Draw everything
-            title_text.draw()
-            subtitle_text.draw()
-            slider.draw()
-            for label in tick_labels:
-                label.draw()
-            value_display.draw()
-            response_display.draw()
-            cursor_dot.draw()  # Draw the cursor dot
-            win.flip()
-            
-            # Check for quit or next page
-            keys = event.getKeys(['escape', 'q', 'space', 'n'])
-            if 'escape' in keys or 'q' in keys:
-                win.close()
-                core.quit()
-            elif ('space' in keys or 'n' in keys) and response is not None:
-                # Store response and move to next page
-                all_responses[f"Q{i}"] = response
-                i += 1
-                break
-
-# Print all responses at the end
-print("\nAll responses:")
-for question, response in all_responses.items():
-    if args.continuous:
-        print(f"{question}: {response:.1f}")
-    else:
-        print(f"{question}: {int(response)}")
-
-win.close()
-core.quit()
+                # Check for quit or next page
+                keys = event.getKeys(['escape', 'q', 'space', 'n'])
+                if 'escape' in keys or 'q' in keys:
+                    save_trajectory()
+                    win.close()
+                    return None
+                elif ('space' in keys or 'n' in keys) and response is not None:
+                    # Store response and move to next page
+                    all_responses[f"Q{i}"] = response
+                    i += 1
+                    break
+
+    # Print all responses at the end
+    print("\nAll responses:")
+    for question, response in all_responses.items():
+        if args.continuous:
+            print(f"{question}: {response:.1f}")
+        else:
+            print(f"{question}: {int(response)}")
+
+    save_trajectory()
+    win.close()
+    return all_responses
+
+def main(argv=None):
+    """Main function when running as script"""
+    run_task(build_parser().parse_args(argv))
+    core.quit()
+
+if __name__ == "__main__":
+    main()
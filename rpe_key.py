@@ -1,23 +1,18 @@
 import argparse
-from psychopy import visual, core, event
 import numpy as np
-from pynput import mouse as pynput_mouse  # Rename the pynput mouse module
 import threading
-import time
-
-# Add argument parser
-parser = argparse.ArgumentParser(description='RPE Rating Task')
-parser.add_argument('--full',
-                   action='store_true',
-                   help='Show all questions. If not set, only shows RPE and Arousal questions.')
-parser.add_argument('--windowed', 
-                   action='store_true', 
-                   help='Run in windowed mode (default is fullscreen).')
-parser.add_argument('--filename', 
-                        type=str, 
-                        default='data_log.csv', 
-                        help='Filename for logging data locally.')  # Added log_filename argument
-args = parser.parse_args()
+from lazy_import import LazyModule
+from input_service import InputService
+from display import DualDisplay
+from lsl_clock import ClockService
+from latency import ClickToPhotonTracker
+from event_codes import LATENCY_BUTTONS, event_sample, event_row
+from marker_binlog import NO_VALUE
+from responses import ResponseStore
+
+# PsychoPy is imported when the first page is built, not when run_rpe is imported
+visual = LazyModule('psychopy.visual')
+event = LazyModule('psychopy.event')
 
 # Define dictionaries for different scales
 rpe_dict = {-5:'Very Bad', -4:'', -3:'Bad', -2:'', -1:'Fairly Bad', 0:'', 
@@ -41,6 +36,9 @@ titles = {
     }]
 }
 
+# Every question key in the order the questions are asked
+question_keys = [question for _, subtitles in titles.values() for question in subtitles]
+
 def create_page(win1, win2, title, subtitle, value_dict, full):
     """Create a page with title, subtitle, and slider based on the value dictionary"""
     # Create title text for both windows (adjusted size and position)
@@ -94,7 +92,72 @@ def create_page(win1, win2, title, subtitle, value_dict, full):
     return (title_text1, subtitle_text1, slider1, value_display1, response_display1, tick_labels1, description_labels1), \
            (title_text2, subtitle_text2, slider2, value_display2, response_display2, tick_labels2, description_labels2)
 
-def run_rpe(win1=None, win2=None, full=False, outlet=None):
+# Pages built once per session, keyed by (win1, win2, title, subtitle)
+_page_cache = {}
+
+def get_page(win1, win2, title, subtitle, value_dict, full):
+    """Return the cached page for this title/subtitle, building it on first use"""
+    key = (win1, win2, title, subtitle)
+    page = _page_cache.get(key)
+    if page is None:
+        page = create_page(win1, win2, title, subtitle, value_dict, full)
+        _page_cache[key] = page
+        return page
+
+    # Reset only the dynamic elements of a reused page
+    (_, _, slider1, _, response_display1, _, _), (_, _, _, _, response_display2, _, _) = page
+    slider1.reset()
+    slider1.fillColor = 'red'
+    for display in (response_display1, response_display2):
+        if display.text:  # Setting text re-lays out glyphs, so skip when already empty
+            display.text = ''
+    return page
+
+# Static parts of each page rendered to one image per window, same keys as _page_cache
+_static_layer_cache = {}
+
+def get_static_layers(win1, win2, title, subtitle):
+    """Return cached BufferImageStims holding everything on a page that never changes.
+
+    On win1 that is all text (the slider is drawn live since it carries the marker);
+    on win2 it is everything except the response text. The page must already be in
+    _page_cache. Capturing draws to and clears the back buffers, so call this
+    between frames.
+    """
+    key = (win1, win2, title, subtitle)
+    layers = _static_layer_cache.get(key)
+    if layers is None:
+        (title_text1, subtitle_text1, _, value_display1, _, tick_labels1, description_labels1), \
+         (title_text2, subtitle_text2, slider2, value_display2, _, tick_labels2, description_labels2) = _page_cache[key]
+        layer1 = visual.BufferImageStim(win1, stim=[title_text1, subtitle_text1, value_display1]
+                                        + tick_labels1 + description_labels1)
+        layer2 = visual.BufferImageStim(win2, stim=[title_text2, subtitle_text2, slider2, value_display2]
+                                        + tick_labels2 + description_labels2)
+        layers = (layer1, layer2)
+        _static_layer_cache[key] = layers
+    return layers
+
+def prewarm_pages(win1, win2, full=True, static_layers=False):
+    """Build and draw every questionnaire page once so later pages show without a layout stall"""
+    for title, (value_dict, subtitles) in titles.items():
+        if title == 'RPE':
+            title = ''
+        if not full and title == 'Please indicate how much you agree with the following statements':
+            continue
+        for subtitle_value in subtitles.values():
+            page1, page2 = get_page(win1, win2, title, subtitle_value, value_dict, full)
+            # Draw to the back buffers and discard, which forces glyph layout now
+            for win, page in ((win1, page1), (win2, page2)):
+                for element in page:
+                    for stim in (element if isinstance(element, list) else [element]):
+                        stim.draw()
+                win.clearBuffer()
+            if static_layers:
+                get_static_layers(win1, win2, title, subtitle_value)
+
+def run_rpe(win1=None, win2=None, full=False, outlet=None, input_service=None, display=None,
+            static_layers=False, clock=None, measure_latency=False, mouse_lock_rate=20, codebook=None,
+            responses=None, log=None):
     """Run the RPE assessment
     
     Args:
@@ -102,15 +165,47 @@ def run_rpe(win1=None, win2=None, full=False, outlet=None):
         win2: psychopy window object for the second window. If None, creates new window
         full: boolean to determine if full questionnaire is shown
         outlet: LSL outlet for sending markers. If None, no markers are sent
+        input_service: running InputService shared by the session. If None, one is
+            started for this assessment and stopped when it ends
+        display: DualDisplay used to flip both windows. If None, one is created in
+            serial mode
+        static_layers: draw each page's static text from a cached BufferImageStim and
+            redraw only the slider and response text
+        clock: ClockService used to timestamp responses. If None, one is created
+        measure_latency: log the time from each button press to the first flip that
+            shows it, and print a summary at the end of the assessment
+        mouse_lock_rate: times per second the pointer is reset to the corner; 0 disables
+            the lock
+        codebook: event_codes.Codebook to send int32 (code, value) events instead of
+            marker strings. The outlet must then be an int32 stream with two channels
+        responses: ResponseStore shared by the session's assessments. If None, one is
+            created for this assessment
+        log: callable that queues a log row (e.g. ExperimentFlow.log_data) as soon as
+            the row is created, so a crash mid-assessment loses at most one flush
+            window. If None, the rows are collected and returned
     Returns:
-        dict: responses from the assessment
+        list: [terminated, rows], where rows is empty when `log` is given
     """
     data_list = []
+    log_row = log if log is not None else data_list.append
     # Create windows if not provided
     if win1 is None:
         win1 = visual.Window(size=(1024, 768), units='height', fullscr=True, color='gray')
     if win2 is None:
         win2 = visual.Window(size=(1024, 768), units='height', fullscr=True, color='gray')
+    if display is None:
+        display = DualDisplay(win1, win2, mode='serial')
+    if clock is None:
+        clock = ClockService()
+    latency_tracker = ClickToPhotonTracker() if measure_latency else None
+
+    # Use the session's input service, or run our own for a standalone assessment
+    if input_service is None:
+        input_service = InputService()
+        input_service.start()
+        stop_input = input_service.stop
+    else:
+        stop_input = lambda: None
 
     # Create mouse object
     mouse_controller = event.Mouse()
@@ -118,19 +213,24 @@ def run_rpe(win1=None, win2=None, full=False, outlet=None):
     # Add a threading.Event to control mouse locking
     mouse_lock_active = threading.Event()
     mouse_lock_active.set()  # Start as active
+    mouse_lock_stop = threading.Event()  # Wakes the lock thread as soon as locking ends
 
-    # Function to continuously reset mouse position
+    # Function to periodically reset mouse position
     def lock_mouse_position():
+        if mouse_lock_rate <= 0:
+            return  # Pointer lock disabled
         while mouse_lock_active.is_set():
             mouse_controller.setPos((-1, -1))
-            time.sleep(0.05)  # Sleep briefly to reduce CPU usage
+            mouse_lock_stop.wait(1 / mouse_lock_rate)  # Sleep between resets to reduce CPU usage
 
     # Start the thread to lock mouse position
     mouse_lock_thread = threading.Thread(target=lock_mouse_position, daemon=True)
     mouse_lock_thread.start()
 
-    # Initialize dictionary to store all responses
-    all_responses = {}
+    # Confirmed answers go into the session's response store, under a new assessment
+    if responses is None:
+        responses = ResponseStore(question_keys)
+    assessment = responses.new_assessment()
     title_ind = 0
     # Loop through each title and its pages
     while title_ind < len(titles):
@@ -155,10 +255,15 @@ def run_rpe(win1=None, win2=None, full=False, outlet=None):
             subtitle_key = list(subtitles.keys())[subtitle_ind]
             subtitle_value = subtitles[subtitle_key]
             response_text = ""  # Reset response_text for each subtitle
+            response_time = None
+            response_value = None
+            # Event names of this question, built once per page rather than per event
+            response_event, confirm_event = f'{subtitle_key}_Response: {{}}', f'{subtitle_key}_confirm'
+            latency_events = {button: f'{subtitle_key}_{button}_click_to_photon_us: {{}}' for button in LATENCY_BUTTONS}
             fill_color = 'red'
-            # Create page elements
+            # Get page elements (built once per session and reused)
             (title_text1, subtitle_text1, slider1, value_display1, response_display1, tick_labels1, description_labels1), \
-             (title_text2, subtitle_text2, slider2, value_display2, response_display2, tick_labels2, description_labels2) = create_page(
+             (title_text2, subtitle_text2, slider2, value_display2, response_display2, tick_labels2, description_labels2) = get_page(
                 win1, win2, title, subtitle_value, value_dict, full
             )
             
@@ -168,68 +273,64 @@ def run_rpe(win1=None, win2=None, full=False, outlet=None):
             middle_index = len(tick_values) // 2
             current_value = tick_values[middle_index]
             
-            last_left_click = False
-            last_right_click = False
-            last_middle_click = False  # Track the state of the middle mouse button
-
-            # Set up pynput listener for mouse buttons
-            def on_click(x, y, button, pressed):
-                nonlocal current_value, all_responses, subtitle_key, response_text, fill_color
-                if pressed:
-                    if button == pynput_mouse.Button.middle or button == pynput_mouse.Button.x1:  # Check for middle button or XButton1
-                        # Format response as key=value
-                        key_response = f"{subtitle_key}={int(current_value)}"  # Use subtitle_key for the response
-                        all_responses[key_response] = current_value
-                        fill_color = 'green'
-                        
-                        # Store the response text to be updated in the main loop
-                        response_text = f"Response: {int(current_value)}"
-
-            # Start the mouse listener
-            listener = pynput_mouse.Listener(on_click=on_click)
-            listener.start()
+            # Values last applied to the stimuli, so unchanged properties are not reassigned
+            shown_value, shown_fill, shown_response = None, 'red', ''
+            if latency_tracker is not None:
+                # Presses in the frame that left the previous page were never drawn on it; their
+                # next flip would include the page change and be logged under this question
+                latency_tracker.discard()
+            if static_layers:
+                static_layer1, static_layer2 = get_static_layers(win1, win2, title, subtitle_value)
 
-            keys = event.getKeys()
-            keys.remove('return') if 'return' in keys else keys
+            # Drop clicks and key presses left over from the previous page
+            input_service.clear()
             
             while True:
+                # Drain all input events since the last frame, in the order they happened
+                input_events = input_service.poll()
+                keys = [e.name for e in input_events if e.kind == 'key']
+
                 # Check for escape key to exit RPE assessment
-                keys = event.getKeys()
                 if 'escape' in keys or 'enter' in keys or 'return' in keys:  # If escape key is pressed
-                    listener.stop()  # Stop the listener
+                    stop_input()
                     # At every return point (including escape/exit), clear the event and join the thread
                     mouse_lock_active.clear()
+                    mouse_lock_stop.set()
                     mouse_lock_thread.join(timeout=0.1)
+                    report_latency(latency_tracker, display)
                     return [True, data_list]  # Return None to indicate termination of RPE assessment
 
-                # Find current index in tick values
-                current_index = tick_values.index(current_value)
-
-                # Handle mouse input
-                mouse_event = event.Mouse(win=win1)
-                mouse_x, mouse_y = mouse_event.getPos()
-                left_click = mouse_event.getPressed()[0]  # Left mouse button
-                middle_click = mouse_event.getPressed()[1]  # Middle mouse button
-                right_click = mouse_event.getPressed()[2]  # Right mouse button
-                
-                # Move left on left click (only if it was not previously clicked)
-                if left_click and not last_left_click:  
-                    if current_index > 0:
-                        current_value = tick_values[current_index - 1]
-                last_left_click = left_click  # Update the last left click state
-
-                # Move right on right click (only if it was not previously clicked)
-                if right_click and not last_right_click:  
-                    if current_index < len(tick_values) - 1:
-                        current_value = tick_values[current_index + 1]
-                last_right_click = right_click  # Update the last right click state
+                for input_event in input_events:
+                    if input_event.kind != 'mouse' or not input_event.pressed:
+                        continue
+                    if latency_tracker is not None:
+                        latency_tracker.pressed(input_event.name, input_event.time)
+                    # Find current index in tick values
+                    current_index = tick_values.index(current_value)
+                    if input_event.name == 'left':  # Move left on left click
+                        if current_index > 0:
+                            current_value = tick_values[current_index - 1]
+                    elif input_event.name == 'right':  # Move right on right click
+                        if current_index < len(tick_values) - 1:
+                            current_value = tick_values[current_index + 1]
+                    elif input_event.name in ('middle', 'x1'):  # Middle button or XButton1 selects
+                        fill_color = 'green'
+                        response_time = input_event.time  # When the button was pressed, on the LSL clock
+                        response_value = int(current_value)
+                        
+                        # Store the response text to be shown on the experimenter window
+                        response_text = f"Response: {int(current_value)}"
 
                 # Check for spacebar to progress to the next question
                 if 'space' in keys and response_text:  # Ensure a response has been recorded
-                    data = f'{subtitle_key}_{response_text}'
-                    timestamp = time.time()
-                    outlet.push_sample([data])
-                    data_list.append([data, timestamp])
+                    # The response carries the time of the button press, the confirm marker the time of the space press
+                    confirm_time = next(e.time for e in input_events if e.kind == 'key' and e.name == 'space')
+                    responses.add(assessment, subtitle_key, response_value, response_time, confirm_time)
+                    for name, value, timestamp in ((response_event, response_value, response_time),
+                                                   (confirm_event, NO_VALUE, confirm_time)):
+                        if outlet is not None:
+                            outlet.push_sample(event_sample(codebook, name, value), timestamp)
+                        log_row(event_row(codebook, name, value, clock.to_wall(timestamp), timestamp))
                     subtitle_ind += 1
                     break
 
@@ -240,54 +341,72 @@ def run_rpe(win1=None, win2=None, full=False, outlet=None):
                     else:
                         subtitle_ind -= 1
                     break
-                
-                last_middle_click = middle_click  # Update the last middle click state
 
-                # Update slider and position indicator
-                slider1.rating = current_value
-                slider1.setTicks(tick_values)  # Ensure the ticks are set to the keys of the value_dict
-                
-                # Draw everything on both windows
-                slider1.fillColor = fill_color
-                title_text1.draw()
-                subtitle_text1.draw()
-                slider1.draw()
-                value_display1.draw()
-                response_display1.draw()
-                
-                # Draw tick labels and descriptions for win1
-                for label in tick_labels1:
-                    label.draw()
-                for desc_label in description_labels1:
-                    desc_label.draw()
-                
-                title_text2.draw()
-                subtitle_text2.draw()
-                slider2.draw()
-                value_display2.draw()
-                response_display2.draw()
-                
-                # Draw tick labels and descriptions for win2
-                for label in tick_labels2:
-                    label.draw()
-                for desc_label in description_labels2:
-                    desc_label.draw()
-                
-                # Update the response display text
-                response_display2.text = response_text  # Update the response display text
+                # Only touch stimulus properties when their value actually changed
+                if current_value != shown_value:
+                    slider1.rating = current_value
+                    shown_value = current_value
+                if fill_color != shown_fill:
+                    slider1.fillColor = fill_color
+                    shown_fill = fill_color
+                if response_text != shown_response:
+                    response_display2.text = response_text  # Update the response display text
+                    shown_response = response_text
+
+                if static_layers:
+                    # Static text is one cached image per window; only the slider and response are redrawn
+                    static_layer1.draw()
+                    slider1.draw()
+                    static_layer2.draw()
+                    response_display2.draw()
+                else:
+                    # Draw everything on both windows
+                    title_text1.draw()
+                    subtitle_text1.draw()
+                    slider1.draw()
+                    value_display1.draw()
+                    response_display1.draw()
+                    
+                    # Draw tick labels and descriptions for win1
+                    for label in tick_labels1:
+                        label.draw()
+                    for desc_label in description_labels1:
+                        desc_label.draw()
+                    
+                    title_text2.draw()
+                    subtitle_text2.draw()
+                    slider2.draw()
+                    value_display2.draw()
+                    response_display2.draw()
+                    
+                    # Draw tick labels and descriptions for win2
+                    for label in tick_labels2:
+                        label.draw()
+                    for desc_label in description_labels2:
+                        desc_label.draw()
                 
-                win1.flip()  # Draw on the first window
-                win2.flip()  # Draw on the second window
+                display.flip()  # Show the frame on both windows
+                if latency_tracker is not None:
+                    # This is the first frame drawn after the presses, so it reflects them
+                    for button, press_time, delta in latency_tracker.flipped(display.last_flip_lsl):
+                        log_row(event_row(codebook, latency_events[button], int(delta * 1e6),
+                                          clock.to_wall(display.last_flip_lsl), display.last_flip_lsl))
 
-            # Stop the listener after exiting the loop
-            listener.stop()
         title_ind += 1
 
     # At the very end of run_rpe, after the main loop, also clear and join
+    stop_input()
     mouse_lock_active.clear()
+    mouse_lock_stop.set()
     mouse_lock_thread.join(timeout=0.1)
+    report_latency(latency_tracker, display)
     return [False, data_list]
 
+def report_latency(latency_tracker, display):
+    """Print the click-to-photon summary of one assessment"""
+    if latency_tracker is not None:
+        print(f"Click-to-photon ({display.mode} display): {latency_tracker.summary()}")
+
 def main():
     """Main function when running as script"""
     parser = argparse.ArgumentParser(description='RPE Rating Task')
@@ -0,0 +1,183 @@
+"""Incremental SQLite index of session marker logs for cross-session queries.
+
+The index remembers the mtime and size of every log it has ingested. update() walks
+the directory, re-parses only logs that are new or have changed and drops logs that
+were deleted, so adding one session to a directory of thousands takes milliseconds:
+
+    python session_index.py logs/ --db sessions.sqlite --question arousal --assessment 600
+
+Two tables can be queried (see SessionIndex.events and SessionIndex.answers):
+    events:  every marker, split into name and value (e.g. 'affect_Response', 5)
+    answers: the tidy questionnaire answers from analysis.tidy
+"""
+import argparse
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+import analysis
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    participant TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER,
+    time REAL
+);
+CREATE TABLE IF NOT EXISTS answers (
+    session_id INTEGER NOT NULL,
+    assessment_s INTEGER,
+    question TEXT NOT NULL,
+    value INTEGER,
+    latency_s REAL
+);
+CREATE INDEX IF NOT EXISTS events_by_name ON events (name, session_id);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (session_id);
+CREATE INDEX IF NOT EXISTS answers_by_question ON answers (question, assessment_s);
+CREATE INDEX IF NOT EXISTS answers_by_session ON answers (session_id);
+"""
+
+
+def _nullable(values, dtype):
+    """NumPy values as Python objects with NaN turned into None, for sqlite3"""
+    return [None if np.isnan(value) else dtype(value) for value in values.tolist()]
+
+
+class SessionIndex:
+    """SQLite index of the events and answers in a directory of session logs"""
+
+    def __init__(self, path='sessions.sqlite', participant_pattern=None):
+        self.path = path
+        self.participant_pattern = participant_pattern
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def update(self, directory):
+        """Ingest new or changed logs below directory and forget deleted ones.
+
+        Returns:
+            dict: counts of 'added', 'updated', 'removed' and 'unchanged' logs
+        """
+        known = {path: (session_id, mtime, size)
+                 for session_id, path, mtime, size in self.db.execute('SELECT id, path, mtime, size FROM sessions')}
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        changed = {}
+        for path in map(os.path.abspath, analysis.find_logs(directory)):
+            stat = os.stat(path)
+            previous = known.pop(path, None)
+            if previous is not None and previous[1:] == (stat.st_mtime, stat.st_size):
+                counts['unchanged'] += 1
+                continue
+            counts['updated' if previous is not None else 'added'] += 1
+            changed[path] = (previous[0] if previous is not None else None, stat)
+
+        # Logs that are in the index but no longer inside this directory
+        root = os.path.join(os.path.abspath(directory), '')
+        gone = [session_id for path, (session_id, _, _) in known.items() if path.startswith(root)]
+        counts['removed'] = len(gone)
+
+        with self.db:
+            self._delete(gone + [session_id for session_id, _ in changed.values() if session_id is not None])
+            self._ingest(changed)
+        return counts
+
+    def _delete(self, session_ids):
+        rows = [(session_id,) for session_id in session_ids]
+        for table, column in (('events', 'session_id'), ('answers', 'session_id'), ('sessions', 'id')):
+            self.db.executemany(f'DELETE FROM {table} WHERE {column} = ?', rows)
+
+    def _ingest(self, changed):
+        """Parse changed logs in one batch and insert their sessions, events and answers"""
+        logs = {}
+        for path, (_, stat) in changed.items():
+            markers = analysis.read_log(path)
+            if markers is not None:
+                logs[path] = markers
+            # Non-log files are recorded too, so they are not re-read on every update
+            self.db.execute('INSERT INTO sessions (path, mtime, size, participant) VALUES (?, ?, ?, ?)',
+                            (path, stat.st_mtime, stat.st_size,
+                             analysis.participant_of(path, self.participant_pattern) if markers is not None else None))
+        if not logs:
+            return
+        ids = dict(self.db.execute(f'SELECT path, id FROM sessions WHERE path IN ({",".join("?" * len(logs))})',
+                                   list(logs)))
+        session_ids = np.asarray([ids[path] for path in logs])
+
+        parsed = analysis.parse_logs(logs)
+        self.db.executemany('INSERT INTO events (session_id, name, value, time) VALUES (?, ?, ?, ?)',
+                            zip(session_ids[parsed['log']].tolist(), parsed['name'].tolist(),
+                                _nullable(parsed['value'], int), _nullable(parsed['time'], float)))
+
+        answers = analysis.tidy(logs, self.participant_pattern)
+        self.db.executemany('INSERT INTO answers (session_id, assessment_s, question, value, latency_s) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            zip([ids[path] for path in answers['session']],
+                                answers['assessment_s'].astype(object).where(answers['assessment_s'].notna(), None),
+                                answers['question'],
+                                answers['value'].astype(object).where(answers['value'].notna(), None),
+                                _nullable(answers['latency_s'].to_numpy(dtype=float), float)))
+
+    def _select(self, table, columns, filters):
+        """Rows of table joined with their session, filtered by {column: value} (None values ignored)"""
+        where = [f'{column} = ?' for column, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        sql = (f'SELECT sessions.participant, sessions.path AS session, {columns} FROM {table} '
+               f'JOIN sessions ON sessions.id = {table}.session_id')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return pd.read_sql_query(sql, self.db, params=params)
+
+    def sessions(self):
+        """All indexed logs with their participant"""
+        return pd.read_sql_query('SELECT path, participant, mtime, size FROM sessions WHERE participant IS NOT NULL',
+                                 self.db)
+
+    def events(self, name=None, participant=None):
+        """Markers by name (e.g. 'cool_down_3_hr', 'rpe_assessment') and/or participant"""
+        return self._select('events', 'name, value, time', {'name': name, 'sessions.participant': participant})
+
+    def answers(self, question=None, assessment_s=None, participant=None):
+        """Questionnaire answers, optionally for one question, assessment time and/or participant"""
+        return self._select('answers', 'assessment_s, question, value, latency_s',
+                            {'question': question, 'assessment_s': assessment_s,
+                             'sessions.participant': participant})
+
+    def mean(self, question, assessment_s=None):
+        """Mean answer to a question across all sessions, e.g. mean('arousal', 600)"""
+        sql = 'SELECT AVG(value) FROM answers WHERE question = ?'
+        params = [question]
+        if assessment_s is not None:
+            sql += ' AND assessment_s = ?'
+            params.append(assessment_s)
+        return self.db.execute(sql, params).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental index of session marker logs')
+    parser.add_argument('directory', help='Directory searched recursively for marker logs.')
+    parser.add_argument('--db', type=str, default='sessions.sqlite', help='SQLite index file.')
+    parser.add_argument('--participant-pattern', type=str, default=None,
+                        help="Regex with a named group 'participant' applied to each log path.")
+    parser.add_argument('--question', type=str, default=None, help='Print the mean answer to this question.')
+    parser.add_argument('--assessment', type=int, default=None, help='Restrict --question to one assessment time (s).')
+    args = parser.parse_args()
+
+    index = SessionIndex(args.db, participant_pattern=args.participant_pattern)
+    print(f"Index update: {index.update(args.directory)}")
+    if args.question:
+        print(f"Mean {args.question}: {index.mean(args.question, args.assessment)}")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""Headless simulation of the VO2Max protocol on a virtual clock.
+
+Installs in-process stand-ins for psychopy, pylsl and pynput before vo2max is
+imported, so the real ExperimentFlow control logic runs unchanged without a display,
+an LSL network or a mouse. Time only advances when a window flips (one frame period
+per vsync) or core.wait() is called, and a scripted virtual participant/experimenter
+answers every question. A full 20+ minute session finishes in about a second of wall
+time and writes the same marker log as a real run.
+
+    python simulation.py --filename sim_log.csv
+"""
+import argparse
+import math
+import random
+import sys
+import time as real_time
+import types
+
+
+class SimulationFinished(Exception):
+    """Raised by the stand-in core.quit() to end the simulated session"""
+
+
+class VirtualClock:
+    """Simulated time: LSL local_clock() and time.time() are both derived from it"""
+
+    def __init__(self, wall_epoch=1750000000.0, lsl_epoch=1000.0):
+        self.t = 0.0
+        self.wall_epoch = wall_epoch
+        self.lsl_epoch = lsl_epoch
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self.t += seconds
+
+    def local_clock(self):
+        return self.lsl_epoch + self.t
+
+    def wall_time(self):
+        return self.wall_epoch + self.t
+
+
+class Simulation:
+    """Shared state of the stand-in modules and the virtual participant"""
+
+    def __init__(self, seed=0, frame_period=1 / 60, response_delay=2.0, confirm_delay=0.5,
+                 screen_delay=1.0, wall_epoch=1750000000.0):
+        self.clock = VirtualClock(wall_epoch=wall_epoch)
+        self.frame_period = frame_period
+        self.rng = random.Random(seed)
+        self.windows = []
+        self.click_callbacks = []
+        self.outlet_samples = []  # (stream name, sample, timestamp) for every push
+        self.physio_sources = {}  # LSL stream name -> (rate, value at virtual time t), see add_physio_sources
+        self.n_flips = 0
+        self.participant = VirtualParticipant(self, response_delay, confirm_delay, screen_delay)
+
+    def add_physio_sources(self, rate=256.0):
+        """Heart-rate and VO2 streams ('SimHR', 'SimVO2') that rise slowly over the protocol"""
+        self.physio_sources['SimHR'] = (rate, lambda t: 90 + 0.06 * t + 2 * math.sin(t / 7))
+        self.physio_sources['SimVO2'] = (rate, lambda t: 0.8 + 0.002 * t + 0.05 * math.sin(t / 11))
+
+    def click(self, button):
+        """Deliver a press and release of a mouse button to every pynput listener"""
+        for callback in list(self.click_callbacks):
+            callback(0, 0, button, True)
+            callback(0, 0, button, False)
+
+
+class VirtualParticipant:
+    """Scripted participant and experimenter.
+
+    On questionnaire pages (a Slider was on screen) the participant moves the slider a
+    random number of steps and presses the middle button after `response_delay` seconds;
+    the experimenter confirms with space `confirm_delay` seconds later. On text screens
+    the experimenter presses space after `screen_delay` seconds, except on the VO2Max and
+    Cool Down screens, which run for their scheduled time.
+    """
+
+    HOLD_SCREENS = ('VO2Max', 'Cool Down')
+
+    def __init__(self, sim, response_delay, confirm_delay, screen_delay):
+        self.sim = sim
+        self.response_delay = response_delay
+        self.confirm_delay = confirm_delay
+        self.screen_delay = screen_delay
+        self.answers = []
+        self._slider = None
+        self._screen = None
+        self._since = 0.0
+        self._clicked_at = None
+        self._confirmed = False
+
+    def _last_frame(self):
+        """Stimuli shown on each window in the most recent frame"""
+        return [win.last_frame for win in self.sim.windows]
+
+    def get_keys(self):
+        now = self.sim.clock.t
+        frames = self._last_frame()
+        sliders = [stim for frame in frames for stim in frame if isinstance(stim, Slider) and stim.size[0] > 0]
+
+        if sliders:
+            slider = sliders[0]
+            if slider is not self._slider:
+                # A new questionnaire page is on screen
+                self._slider, self._screen = slider, None
+                self._since, self._clicked_at, self._confirmed = now, None, False
+            if self._clicked_at is None and now - self._since >= self.response_delay:
+                steps = self.sim.rng.randint(-2, 2)
+                for _ in range(abs(steps)):
+                    self.sim.click(Button.right if steps > 0 else Button.left)
+                self.sim.click(Button.middle)
+                self.answers.append(steps)
+                self._clicked_at = now
+            elif self._clicked_at is not None and not self._confirmed and now - self._clicked_at >= self.confirm_delay:
+                self._confirmed = True
+                return ['space']
+            return []
+
+        texts = [stim.text for frame in frames for stim in frame if isinstance(stim, TextStim) and stim.text]
+        screen = texts[-1] if texts else ''
+        if self._slider is not None or screen != self._screen:
+            self._slider, self._screen, self._since = None, screen, now
+        if screen.startswith(self.HOLD_SCREENS):
+            return []
+        if now - self._since >= self.screen_delay:
+            return ['space']
+        return []
+
+    def pointer_pos(self):
+        """Pointer position for event.Mouse: a slow sweep across the slider"""
+        return (0.4 * math.sin(self.sim.clock.t), 0.0)
+
+    def mouse_pressed(self):
+        """Left button state for event.Mouse: held from the response until it is confirmed"""
+        held = self._slider is not None and self._clicked_at is not None and not self._confirmed
+        return [int(held), 0, 0]
+
+
+# The stand-ins below reference the active Simulation through this module global
+_sim = None
+
+
+# --- psychopy.visual -------------------------------------------------------------
+
+class Window:
+    def __init__(self, size=(800, 600), units='height', fullscr=False, screen=0, color='gray',
+                 waitBlanking=True, **kwargs):
+        self.size = size
+        self.units = units
+        self.fullscr = fullscr
+        self.screen = screen
+        self.color = color
+        self.waitBlanking = waitBlanking
+        self.monitorFramePeriod = _sim.frame_period
+        self.drawn = []
+        self.last_frame = []
+        self.closed = False
+        _sim.windows.append(self)
+
+    def flip(self, clearBuffer=True):
+        _sim.n_flips += 1
+        self.last_frame = self.drawn
+        self.drawn = []
+        if not self.waitBlanking:
+            return None  # As in PsychoPy: no flip time without waiting for blanking
+        # Block until the next (virtual) vertical blank; refreshes are every frame_period from t=0
+        period = _sim.frame_period
+        _sim.clock.advance((math.floor(_sim.clock.t / period + 1e-6) + 1) * period - _sim.clock.t)
+        return _sim.clock.local_clock()
+
+    def clearBuffer(self, color=True, depth=False, stencil=False):
+        self.drawn = []
+
+    def close(self):
+        self.closed = True
+
+
+class _Stim:
+    def __init__(self, win=None, **kwargs):
+        self.win = win
+        self.__dict__.update(kwargs)
+
+    def draw(self, win=None):
+        (win or self.win).drawn.append(self)
+
+
+class TextStim(_Stim):
+    def __init__(self, win=None, text='', pos=(0, 0), height=0.05, **kwargs):
+        super().__init__(win, text=text, pos=pos, height=height, **kwargs)
+
+
+class Circle(_Stim):
+    pass
+
+
+class Rect(_Stim):
+    pass
+
+
+class Slider(_Stim):
+    def __init__(self, win=None, size=(1, 0.1), pos=(0, 0), ticks=(1, 2, 3, 4, 5), **kwargs):
+        super().__init__(win, size=size, pos=pos, ticks=list(ticks), rating=None, **kwargs)
+
+    def setTicks(self, ticks):
+        self.ticks = list(ticks)
+
+    def reset(self):
+        self.rating = None
+
+
+class BufferImageStim(_Stim):
+    def __init__(self, win, stim=(), **kwargs):
+        super().__init__(win, stim=list(stim), **kwargs)
+        win.clearBuffer()
+
+    def draw(self, win=None):
+        (win or self.win).drawn.extend(self.stim)
+
+
+# --- psychopy.core ---------------------------------------------------------------
+
+def wait(secs, hogCPUperiod=0.2):
+    _sim.clock.advance(secs)
+
+
+def quit():
+    raise SimulationFinished()
+
+
+def getTime():
+    return _sim.clock.t
+
+
+class Clock:
+    def __init__(self):
+        self._start = _sim.clock.t
+
+    def getTime(self):
+        return _sim.clock.t - self._start
+
+    def reset(self, newT=0.0):
+        self._start = _sim.clock.t + newT
+
+
+class CountdownTimer(Clock):
+    def __init__(self, start=0):
+        super().__init__()
+        self._duration = start
+
+    def getTime(self):
+        return self._duration - super().getTime()
+
+
+# --- psychopy.event --------------------------------------------------------------
+
+def getKeys(keyList=None, timeStamped=False):
+    keys = _sim.participant.get_keys()
+    if keyList is not None:
+        keys = [key for key in keys if key in keyList]
+    if timeStamped:
+        return [(key, _sim.clock.t) for key in keys]
+    return keys
+
+
+def clearEvents(eventType=None):
+    pass
+
+
+class Mouse:
+    def __init__(self, visible=True, win=None, **kwargs):
+        self.pos = (0, 0)
+
+    def setPos(self, newPos=(0, 0)):
+        self.pos = newPos
+
+    def getPos(self):
+        return _sim.participant.pointer_pos()
+
+    def getPressed(self, getTime=False):
+        return _sim.participant.mouse_pressed()
+
+    def setVisible(self, visible):
+        pass
+
+
+# --- pylsl -----------------------------------------------------------------------
+
+class _XMLElement:
+    def append_child(self, name):
+        return self
+
+    def append_child_value(self, name, value):
+        return self
+
+
+class StreamInfo:
+    def __init__(self, name='untitled', type='', channel_count=1, nominal_srate=0,
+                 channel_format='float32', source_id=''):
+        self._name = name
+        self._nominal_srate = nominal_srate
+        self._desc = _XMLElement()
+
+    def name(self):
+        return self._name
+
+    def nominal_srate(self):
+        return self._nominal_srate
+
+    def desc(self):
+        return self._desc
+
+
+class StreamOutlet:
+    def __init__(self, info, chunk_size=0, max_buffered=360):
+        self.info = info
+
+    def push_sample(self, x, timestamp=0.0, pushthrough=True):
+        _sim.outlet_samples.append((self.info.name(), list(x), timestamp or _sim.clock.local_clock()))
+
+    def push_chunk(self, x, timestamp=0.0, pushthrough=True):
+        for sample in x:
+            self.push_sample(sample, timestamp, pushthrough)
+
+    def have_consumers(self):
+        return False
+
+
+def local_clock():
+    return _sim.clock.local_clock()
+
+
+proc_clocksync = 1
+
+
+def resolve_byprop(prop, value, minimum=1, timeout=1.0):
+    if prop != 'name' or value not in _sim.physio_sources:
+        return []
+    return [StreamInfo(name=value, nominal_srate=_sim.physio_sources[value][0])]
+
+
+class StreamInlet:
+    """Inlet of a simulated physiological source: samples up to the current virtual time"""
+
+    def __init__(self, info, max_buflen=360, max_chunklen=0, recover=True, processing_flags=0):
+        self.rate, self.signal = _sim.physio_sources[info.name()]
+        self._next = _sim.clock.t
+
+    def pull_chunk(self, timeout=0.0, max_samples=1024):
+        n = min(int((_sim.clock.t - self._next) * self.rate) + 1, max_samples) if _sim.clock.t >= self._next else 0
+        times = [self._next + i / self.rate for i in range(n)]
+        self._next += n / self.rate
+        return [[self.signal(t)] for t in times], [_sim.clock.lsl_epoch + t for t in times]
+
+    def close_stream(self):
+        pass
+
+
+# --- pynput.mouse ----------------------------------------------------------------
+
+class Button:
+    left = 'Button.left'
+    right = 'Button.right'
+    middle = 'Button.middle'
+    x1 = 'Button.x1'
+
+
+class Listener:
+    def __init__(self, on_click=None, **kwargs):
+        self.on_click = on_click
+
+    def start(self):
+        _sim.click_callbacks.append(self.on_click)
+
+    def stop(self):
+        if self.on_click in _sim.click_callbacks:
+            _sim.click_callbacks.remove(self.on_click)
+
+
+class Controller:
+    @property
+    def position(self):
+        """Screen pixels of the participant's pointer, over the first window"""
+        x, y = _sim.participant.pointer_pos()
+        width, height = _sim.windows[0].size if _sim.windows else (800, 600)
+        return x * height + width / 2, height / 2 - y * height
+
+
+# --- time (patched into the project modules only) --------------------------------
+
+def _make_time_module():
+    sim_time = types.ModuleType('sim_time')
+    sim_time.time = _sim.clock.wall_time
+    sim_time.perf_counter = lambda: _sim.clock.t
+    sim_time.monotonic = lambda: _sim.clock.t
+    sim_time.process_time = real_time.process_time  # CPU time is real work, not simulated
+    # Background threads (e.g. the mouse lock) only need to yield, not really wait
+    sim_time.sleep = lambda secs: real_time.sleep(min(secs, 0.001))
+    return sim_time
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+# Project modules whose `time` is replaced by the virtual clock
+SIMULATED_TIME_MODULES = ('vo2max', 'rpe_key', 'input_service', 'display', 'frame_timing', 'lsl_clock',
+                          'physio_stream')
+
+
+def install(sim, real_lsl=False):
+    """Install the stand-in modules. Must run before vo2max is imported.
+
+    With real_lsl the installed pylsl is left in place, e.g. to measure real outlets.
+    """
+    global _sim
+    _sim = sim
+    visual = _module('psychopy.visual', Window=Window, TextStim=TextStim, Circle=Circle, Rect=Rect,
+                     Slider=Slider, BufferImageStim=BufferImageStim)
+    core = _module('psychopy.core', wait=wait, quit=quit, getTime=getTime, Clock=Clock,
+                   CountdownTimer=CountdownTimer)
+    event = _module('psychopy.event', getKeys=getKeys, clearEvents=clearEvents, Mouse=Mouse)
+    psychopy = _module('psychopy', visual=visual, core=core, event=event)
+    pylsl = _module('pylsl', StreamInfo=StreamInfo, StreamOutlet=StreamOutlet, local_clock=local_clock,
+                    StreamInlet=StreamInlet, resolve_byprop=resolve_byprop, proc_clocksync=proc_clocksync)
+    mouse = _module('pynput.mouse', Button=Button, Listener=Listener, Controller=Controller)
+    pynput = _module('pynput', mouse=mouse)
+    sys.modules.update({
+        'psychopy': psychopy, 'psychopy.visual': visual, 'psychopy.core': core, 'psychopy.event': event,
+        'pynput': pynput, 'pynput.mouse': mouse,
+    })
+    if not real_lsl:
+        sys.modules['pylsl'] = pylsl
+
+
+def use_virtual_time():
+    """Point `time` in the already imported project modules at the virtual clock"""
+    sim_time = _make_time_module()
+    for name in SIMULATED_TIME_MODULES:
+        module = sys.modules.get(name)
+        if module is not None and hasattr(module, 'time'):
+            module.time = sim_time
+
+
+def run_simulation(filename='sim_log.csv', seed=0, physio_rate=None, **experiment_kwargs):
+    """Run the whole protocol headlessly and return the Simulation and wall time taken.
+
+    With a physio_rate, simulated HR and VO2 streams are sent at that rate and subscribed to.
+    """
+    sim = Simulation(seed=seed)
+    if physio_rate:
+        sim.add_physio_sources(physio_rate)
+        experiment_kwargs['physio_streams'] = {'hr': 'SimHR', 'vo2': 'SimVO2'}
+    install(sim)
+    import vo2max  # Imported only now so it binds to the stand-ins
+    use_virtual_time()
+
+    start = real_time.perf_counter()
+    experiment = vo2max.ExperimentFlow(screen=0, fullscreen=False, filename=filename, **experiment_kwargs)
+    try:
+        experiment.run_experiment()
+    except SimulationFinished:
+        pass
+    elapsed = real_time.perf_counter() - start
+    return sim, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless VO2Max protocol simulation')
+    parser.add_argument('--filename', type=str, default='sim_log.csv',
+                        help='Marker log written by the simulated session.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the virtual participant\'s answers.')
+    parser.add_argument('--display-mode', choices=['serial', 'primary'], default='serial',
+                        help='DualDisplay mode to simulate.')
+    parser.add_argument('--latency', action='store_true',
+                        help='Measure click-to-photon latency in the simulated assessments.')
+    parser.add_argument('--no-idle', action='store_true',
+                        help='Redraw static screens every frame, as before idle mode.')
+    parser.add_argument('--event-codes', action='store_true',
+                        help='Send integer event codes instead of marker strings.')
+    parser.add_argument('--physio-rate', type=float, default=None,
+                        help='Simulate HR and VO2 LSL streams at this rate (Hz) and subscribe to them.')
+    args, _ = parser.parse_known_args()
+
+    sim, elapsed = run_simulation(filename=args.filename, seed=args.seed, display_mode=args.display_mode,
+                                  measure_latency=args.latency, idle=not args.no_idle, event_codes=args.event_codes,
+                                  physio_rate=args.physio_rate)
+    print(f"Simulated {sim.clock.t:.1f} s of protocol ({sim.n_flips} flips, "
+          f"{len(sim.outlet_samples)} markers) in {elapsed:.3f} s wall time -> {args.filename}")
+
+if __name__ == "__main__":
+    main()
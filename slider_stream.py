@@ -0,0 +1,76 @@
+import threading
+import time
+import numpy as np
+from pylsl import StreamInfo, StreamOutlet, local_clock
+
+
+class SliderStream:
+    """Stream the continuous slider position as float32 LSL samples (value, question).
+
+    The render loop sets `value` to the hovered value it draws each frame. A background
+    thread reads it at a fixed nominal rate and collects the samples into a
+    preallocated chunk that is sent
+    with push_chunk every `chunk_size` samples. Only the timestamp of the newest
+    sample is passed; LSL back-dates the others from the nominal rate.
+
+    Each sample is 8 bytes on the wire, instead of one string marker per value.
+    """
+
+    def __init__(self, rate=100.0, chunk_size=10, name='RPEContinuous', clock=local_clock, metadata=None):
+        self.period = 1 / rate
+        self.clock = clock
+        self.value = None  # Hovered value on the current page, None before the first frame
+        self.question = -1
+
+        info = StreamInfo(name, 'Rating', 2, rate, 'float32', f'{name.lower()}stream')
+        channels = info.desc().append_child('channels')
+        for label in ('value', 'question'):
+            channels.append_child('channel').append_child_value('label', label)
+        for key, value in (metadata or {}).items():
+            info.desc().append_child_value(key, str(value))  # e.g. participant and date
+        self.outlet = StreamOutlet(info, chunk_size=chunk_size)
+
+        self._chunk = np.zeros((chunk_size, 2), dtype=np.float32)
+        self._filled = 0
+        self.n_pushed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the streaming thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='SliderStream', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the streaming thread and send any partly filled chunk"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._push()
+
+    def _push(self):
+        if self._filled:
+            self.outlet.push_chunk(self._chunk[:self._filled], self._last_time)
+            self.n_pushed += self._filled
+            self._filled = 0
+
+    def _run(self):
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            value = self.value
+            if value is not None:
+                self._chunk[self._filled] = (value, self.question)
+                self._filled += 1
+                self._last_time = self.clock()
+                if self._filled == len(self._chunk):
+                    self._push()
+
+            next_sample += self.period
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.perf_counter()  # Fell behind: keep the nominal spacing from now on
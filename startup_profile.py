@@ -0,0 +1,56 @@
+import contextlib
+import json
+import threading
+import time
+
+
+class StartupProfile:
+    """Time each start-up stage from script start to the first frame on screen.
+
+    Stages are timed with stage() as a context manager, on whichever thread runs them,
+    so stages that overlap (e.g. the outlet created while the windows open) show up
+    with their own start offsets. first_frame() is called after the first flip; the
+    report gives every stage and the total time to that frame, in seconds since
+    `start` (the perf_counter value taken when the script began importing).
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.stages = []  # (name, thread, start offset, duration)
+        self.first_frame_s = None
+        self._lock = threading.Lock()
+
+    def add(self, name, begin, end):
+        """Record a stage that ran from perf_counter time begin to end"""
+        with self._lock:
+            self.stages.append((name, threading.current_thread().name, begin - self.start, end - begin))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, begin, time.perf_counter())
+
+    def first_frame(self):
+        """Mark the first frame; returns True only on the first call"""
+        if self.first_frame_s is not None:
+            return False
+        self.first_frame_s = time.perf_counter() - self.start
+        return True
+
+    def report(self):
+        """Return the time to first frame and each stage's start offset and duration"""
+        with self._lock:
+            stages = sorted(self.stages, key=lambda stage: stage[2])
+        return {
+            'first_frame_s': round(self.first_frame_s, 4) if self.first_frame_s is not None else None,
+            'stages': [{'stage': name, 'thread': thread, 'start_s': round(offset, 4), 'duration_s': round(duration, 4)}
+                       for name, thread, offset, duration in stages],
+        }
+
+    def write_report(self, path):
+        """Write the report as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
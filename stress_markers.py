@@ -0,0 +1,207 @@
+"""Throughput and latency stress test of the marker pipeline.
+
+Fires bursts or a sustained storm of markers through the real
+ExperimentFlow.push_sample path (LSL push + background log writer) and reports:
+    - push cost: time the caller (the draw loop) spends in push_sample
+    - enqueue-to-disk: push_sample call until the row is flushed by the log writer
+    - enqueue-to-inlet: push_sample call until a local LSL inlet receives the marker
+
+PsychoPy and pynput are replaced by the simulation stand-ins (no windows are opened);
+the LSL outlet is real unless --stand-in-outlet is given. The exit status is non-zero
+when the throughput or latency thresholds are not met, so it can gate CI:
+
+    python stress_markers.py --mode burst --count 20000 --min-rate 20000 --max-push-p99-us 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+import simulation
+
+
+class TimedSink:
+    """Wraps a marker log sink and records when each stress marker reached the disk"""
+
+    def __init__(self, sink, disk_times):
+        self.sink = sink
+        self.disk_times = disk_times
+        self._pending = []
+
+    def write_rows(self, items):
+        self.sink.write_rows(items)
+        self._pending.extend(_marker_index(row[0]) for row, _ in items)
+
+    def flush(self, fsync=True):
+        self.sink.flush(fsync)
+        now = time.perf_counter()
+        for index in self._pending:
+            if index is not None:
+                self.disk_times[index] = now
+        self._pending = []
+
+    def close(self):
+        self.sink.close()
+
+
+def _marker_index(marker):
+    """Return i for a 'stress_<i>' marker, None for anything else"""
+    if isinstance(marker, str) and marker.startswith('stress_'):
+        return int(marker[7:])
+    return None
+
+
+def _percentiles(latencies):
+    """p50/p99/max in microseconds of the finite values"""
+    latencies = latencies[np.isfinite(latencies)] * 1e6
+    if not len(latencies):
+        return {'n': 0}
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {'n': int(len(latencies)), 'p50_us': float(p50), 'p99_us': float(p99),
+            'max_us': float(latencies.max())}
+
+
+def run_stress(mode='burst', count=20000, rate=1000.0, flush_interval=0.5, log_format='csv',
+               stand_in_outlet=False, filename=None):
+    simulation.install(simulation.Simulation(), real_lsl=not stand_in_outlet)
+    import pylsl
+    import vo2max  # Imported only now so psychopy/pynput resolve to the stand-ins
+    from lsl_clock import ClockService
+
+    enqueue_times = np.full(count, np.nan)
+    disk_times = np.full(count, np.nan)
+    inlet_times = np.full(count, np.nan)
+    push_costs = np.full(count, np.nan)
+
+    source_id = f'stimstress{os.getpid()}'
+    outlet = pylsl.StreamOutlet(pylsl.StreamInfo('StimMarkersStress', 'Markers', 1, 0, 'string', source_id))
+
+    # Receive markers on a local inlet, as LabRecorder would
+    stop = threading.Event()
+    inlet_thread = None
+    if not stand_in_outlet:
+        streams = pylsl.resolve_byprop('source_id', source_id, timeout=5)
+        if not streams:
+            raise RuntimeError('Could not resolve the stress test stream on the local LSL network')
+        inlet = pylsl.StreamInlet(streams[0])
+        inlet.open_stream(timeout=5)
+
+        def receive():
+            while not stop.is_set():
+                sample, _ = inlet.pull_sample(timeout=0.1)
+                if sample is not None:
+                    index = _marker_index(sample[0])
+                    if index is not None:
+                        inlet_times[index] = time.perf_counter()
+
+        inlet_thread = threading.Thread(target=receive, daemon=True)
+        inlet_thread.start()
+        time.sleep(0.5)  # Let the inlet connect before the first marker
+
+    # An ExperimentFlow with only its logging and LSL parts set up (no windows)
+    log_dir = tempfile.mkdtemp(prefix='stress_markers_')
+    flow = vo2max.ExperimentFlow.__new__(vo2max.ExperimentFlow)
+    flow.outlet = outlet
+    flow.clock = ClockService()
+    flow.filename = filename or os.path.join(log_dir, 'stress_log.csv')
+    flow.flush_interval = flush_interval
+    flow.log_format = log_format
+    flow.codebook = None  # String markers
+    flow.setup_logging()
+    flow.marker_writer.sink = TimedSink(flow.marker_writer.sink, disk_times)
+
+    markers = [[f'stress_{i}'] for i in range(count)]
+    start = time.perf_counter()
+    for i in range(count):
+        if mode == 'sustained':
+            target = start + i / rate
+            while time.perf_counter() < target:
+                pass  # Spin so the storm keeps its nominal rate
+        t0 = time.perf_counter()
+        enqueue_times[i] = t0
+        flow.push_sample(markers[i])
+        push_costs[i] = time.perf_counter() - t0
+    send_time = time.perf_counter() - start
+
+    flow.marker_writer.close()
+    if inlet_thread is not None:
+        deadline = time.perf_counter() + 5
+        while np.isnan(inlet_times).any() and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        stop.set()
+        inlet_thread.join()
+
+    report = {
+        'mode': mode,
+        'count': count,
+        'nominal_rate': rate if mode == 'sustained' else None,
+        'throughput_per_s': count / send_time,
+        'push_cost': _percentiles(push_costs),
+        'enqueue_to_disk': _percentiles(disk_times - enqueue_times),
+        'enqueue_to_inlet': _percentiles(inlet_times - enqueue_times) if inlet_thread else None,
+        'writer': flow.marker_writer.stats(),
+    }
+    return report
+
+
+def check_thresholds(report, min_rate=None, max_push_p99_us=None, max_disk_p99_us=None, baseline=None,
+                     tolerance=0.2):
+    """Return a list of failed checks (empty if everything passed)"""
+    failures = []
+    if min_rate is not None and report['throughput_per_s'] < min_rate:
+        failures.append(f"throughput {report['throughput_per_s']:.0f}/s below {min_rate:.0f}/s")
+    if max_push_p99_us is not None and report['push_cost']['p99_us'] > max_push_p99_us:
+        failures.append(f"push p99 {report['push_cost']['p99_us']:.1f} us above {max_push_p99_us} us")
+    if max_disk_p99_us is not None and report['enqueue_to_disk']['p99_us'] > max_disk_p99_us:
+        failures.append(f"disk p99 {report['enqueue_to_disk']['p99_us']:.0f} us above {max_disk_p99_us} us")
+    if baseline is not None:
+        floor = baseline['throughput_per_s'] * (1 - tolerance)
+        if report['throughput_per_s'] < floor:
+            failures.append(f"throughput {report['throughput_per_s']:.0f}/s regressed more than "
+                            f"{tolerance:.0%} from baseline {baseline['throughput_per_s']:.0f}/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Marker pipeline stress test')
+    parser.add_argument('--mode', choices=['burst', 'sustained'], default='burst',
+                        help='burst: push as fast as possible; sustained: push at --rate.')
+    parser.add_argument('--count', type=int, default=20000, help='Number of markers to push.')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Markers per second in sustained mode.')
+    parser.add_argument('--flush-interval', type=float, default=0.5, help='Log writer flush interval.')
+    parser.add_argument('--log-format', choices=['csv', 'binary'], default='csv', help='Log format to write.')
+    parser.add_argument('--stand-in-outlet', action='store_true',
+                        help='Use the simulation outlet instead of a real LSL outlet and inlet.')
+    parser.add_argument('--output', type=str, default=None, help='Write the report as JSON.')
+    parser.add_argument('--min-rate', type=float, default=None, help='Fail below this many markers per second.')
+    parser.add_argument('--max-push-p99-us', type=float, default=None, help='Fail if p99 push cost exceeds this.')
+    parser.add_argument('--max-disk-p99-us', type=float, default=None,
+                        help='Fail if p99 enqueue-to-disk latency exceeds this.')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Earlier report JSON; fail if throughput regressed by more than --tolerance.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed throughput regression (fraction).')
+    args = parser.parse_args()
+
+    report = run_stress(mode=args.mode, count=args.count, rate=args.rate, flush_interval=args.flush_interval,
+                        log_format=args.log_format, stand_in_outlet=args.stand_in_outlet)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = check_thresholds(report, args.min_rate, args.max_push_p99_us, args.max_disk_p99_us,
+                                baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
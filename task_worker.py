@@ -0,0 +1,111 @@
+import multiprocessing
+
+# Messages from the worker to the launcher, as (kind, payload) tuples:
+#   ('status', text)     progress while warming up
+#   ('ready', None)      PsychoPy imported and the window created; waiting for a task
+#   ('running', task)    a task was received and has started
+#   ('done', result)     the task finished; result is what it returned
+#   ('error', text)      warm-up or the task failed
+
+
+def _set_visible(win, visible):
+    """Show or hide a PsychoPy window (pyglet backend); other backends stay visible"""
+    win_handle = getattr(getattr(win, 'backend', None), 'winHandle', None) or getattr(win, 'winHandle', None)
+    if hasattr(win_handle, 'set_visible'):
+        win_handle.set_visible(visible)
+
+
+def _wait_for_launcher(conn):
+    """Block until the launcher sends or hangs up, so our last message is not lost on exit"""
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+
+
+def _worker_main(conn):
+    """Worker process: import PsychoPy and create the window, then run one task"""
+    try:
+        conn.send(('status', 'Loading PsychoPy...'))
+        from psychopy import visual
+        import rpe
+        conn.send(('status', 'Creating window...'))
+        win = visual.Window(size=(1024, 768), units='height', fullscr=False, color='gray')
+        _set_visible(win, False)  # Kept off-screen until the task starts
+    except Exception as e:
+        conn.send(('error', f"Worker failed to start: {e!r}"))
+        _wait_for_launcher(conn)
+        return
+    conn.send(('ready', None))
+
+    task, metadata = conn.recv()
+    if task is None:
+        win.close()
+        return  # Launcher closed without starting a task
+    try:
+        argv = []
+        for key in ('participant', 'date'):
+            if metadata.get(key):
+                argv += [f'--{key}', metadata[key]]
+        args = rpe.build_parser().parse_args(argv)
+        _set_visible(win, True)
+        conn.send(('running', task))
+        conn.send(('done', rpe.run_task(args, win=win)))
+    except Exception as e:
+        conn.send(('error', f"Error running task: {e!r}"))
+
+
+class TaskWorker:
+    """A task process started ahead of time, so PsychoPy start-up overlaps form entry.
+
+    start() spawns the worker, which imports PsychoPy and the task module and creates
+    its window hidden, then waits. dispatch() sends the task with the session metadata;
+    the window is shown and the task runs immediately. The launcher calls poll() from
+    its event loop to receive status messages without blocking.
+    """
+
+    def __init__(self):
+        self._context = multiprocessing.get_context('spawn')  # No forked Tk state in the child
+        self._conn = None
+        self.process = None
+        self.state = 'stopped'
+
+    def start(self):
+        """Spawn the worker process"""
+        self._conn, child_conn = self._context.Pipe()
+        self.process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        self.state = 'starting'
+
+    def dispatch(self, task, metadata):
+        """Send a task and its session metadata (e.g. participant, date); queued until the worker is ready"""
+        self._conn.send((task, metadata))
+        self.state = 'dispatched'
+
+    def poll(self):
+        """Return the worker's messages since the last call, without blocking"""
+        messages = []
+        try:
+            while self._conn is not None and self._conn.poll():
+                kind, payload = self._conn.recv()
+                messages.append((kind, payload))
+                if kind in ('running', 'done', 'error') or (kind == 'ready' and self.state == 'starting'):
+                    self.state = kind  # A task dispatched before 'ready' stays dispatched
+        except (EOFError, OSError):
+            if self.state not in ('done', 'error'):
+                messages.append(('error', 'Worker exited unexpectedly'))
+                self.state = 'error'
+            self._conn = None
+        return messages
+
+    def stop(self):
+        """Tell an idle worker to exit, or terminate it"""
+        if self.process is None:
+            return
+        if self.state in ('starting', 'ready') and self._conn is not None:
+            self._conn.send((None, None))
+            self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        self.state = 'stopped'
@@ -0,0 +1,78 @@
+import collections
+from pylsl import local_clock
+
+# One fired event: offset is seconds from the timeline start, scheduled and actual are clock times
+FiredEvent = collections.namedtuple('FiredEvent', ['name', 'offset', 'scheduled', 'actual'])
+
+
+class Timeline:
+    """Precomputed event schedule on a monotonic clock (LSL local_clock by default).
+
+    Every event's due time is fixed when the timeline starts (start + offset), so a
+    late event never shifts the ones after it. poll() returns the next event as soon
+    as it is due and records when it actually fired, which makes the protocol jitter
+    measurable with report().
+
+    A start_time in the past (e.g. to count a warmup toward protocol time) can make
+    events due before polling began. Their scheduled time is clamped to the moment
+    start() was called, so they are not reported as late for time the timeline was
+    not running.
+    """
+
+    def __init__(self, events, clock=local_clock):
+        """
+        Args:
+            events: iterable of (offset_seconds, name) pairs
+            clock: function returning the current time in seconds
+        """
+        self.events = sorted(events, key=lambda e: e[0])
+        self.clock = clock
+        self.start_time = None
+        self.polling_start = None  # When start() was called; no event is scheduled earlier
+        self.fired = []
+        self._next = 0
+
+    def start(self, start_time=None):
+        """Fix the schedule relative to start_time (default: now)"""
+        self.polling_start = self.clock()
+        self.start_time = self.polling_start if start_time is None else start_time
+        self.fired = []
+        self._next = 0
+
+    def finished(self):
+        return self._next >= len(self.events)
+
+    def time_until_next(self):
+        """Seconds until the next event is due (negative if overdue), None if finished"""
+        if self.finished():
+            return None
+        return self._scheduled(self.events[self._next][0]) - self.clock()
+
+    def _scheduled(self, offset):
+        """Due time of an event, not earlier than the start of polling"""
+        return max(self.start_time + offset, self.polling_start)
+
+    def poll(self):
+        """Return the next event as a FiredEvent if it is due, otherwise None"""
+        if self.finished():
+            return None
+        offset, name = self.events[self._next]
+        scheduled = self._scheduled(offset)
+        now = self.clock()
+        if now < scheduled:
+            return None
+        fired = FiredEvent(name, offset, scheduled, now)
+        self.fired.append(fired)
+        self._next += 1
+        return fired
+
+    def report(self):
+        """Return lateness statistics (actual - scheduled) of the fired events"""
+        lateness = [event.actual - event.scheduled for event in self.fired]
+        return {
+            'fired': len(self.fired),
+            'pending': len(self.events) - self._next,
+            'due_at_start': sum(event.scheduled == self.polling_start for event in self.fired),
+            'mean_lateness_ms': 1000 * sum(lateness) / len(lateness) if lateness else 0.0,
+            'max_lateness_ms': 1000 * max(lateness) if lateness else 0.0,
+        }
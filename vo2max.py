@@ -1,52 +1,48 @@
-from psychopy import visual, core, event
 import time
-from pylsl import StreamInfo, StreamOutlet
-from rpe_key import run_rpe
+_script_start = time.perf_counter()  # Zero of the --profile-startup report
+
+# NumPy and pylsl stay eager: the clocks and ring buffers bind local_clock and build their
+# dtypes at import, and both are needed for the outlet before the first frame anyway.
+# They are imported first so --profile-startup can time them on their own.
+import numpy
+_numpy_done = time.perf_counter()
+import pylsl
+_pylsl_done = time.perf_counter()
+
 import argparse
-import csv  # Add this import at the top
+import contextlib
+import os
 import threading
+from pylsl import StreamInfo, StreamOutlet, local_clock
+from lazy_import import LazyModule
+from rpe_key import run_rpe, prewarm_pages, titles, question_keys
+from marker_log import MarkerWriter, CsvSink
+from marker_binlog import BinarySink, NO_VALUE
+from event_codes import build_codebook, event_sample, event_row
+from responses import ResponseStore
+from input_service import InputService
+from display import DualDisplay, DISPLAY_MODES
+from frame_timing import FrameTimer
+from timeline import Timeline
+from lsl_clock import ClockService
+from startup_profile import StartupProfile
+from physio_stream import PhysioMonitor
+
+# PsychoPy is imported by ExperimentFlow, on the main thread that opens the windows
+visual = LazyModule('psychopy.visual')
+core = LazyModule('psychopy.core')
+event = LazyModule('psychopy.event')
+_imports_done = time.perf_counter()
 
 class ExperimentFlow:
-    def __init__(self, screen=1, fullscreen=True, filename='data_log.csv'):  # Added filename parameter
-        # Set up LSL stream
-        self.info = StreamInfo('StimMarkers', 'Markers', 1, 0, 'string', 'uniqueid')
-        self.outlet = StreamOutlet(self.info)
+    def __init__(self, screen=1, fullscreen=True, filename='data_log.csv',  # Added filename parameter
+                 flush_interval=0.5, log_format='csv', display_mode='serial', frame_timing=False,
+                 frame_diagnostics=False, static_layers=False, measure_latency=False, target_fps=None,
+                 idle=True, mouse_lock_rate=20, event_codes=False, startup_profile=None,
+                 physio_streams=None, physio_window=10.0):
+        self.startup = startup_profile  # StartupProfile timing each stage up to the first frame, or None
+        self.clock = ClockService()  # LSL clock shared by the outlet and the local log
         self.terminate_requested = False
-        
-        # Create two windows based on fullscreen parameter
-        self.win1 = visual.Window(
-            size=(860, 480),
-            units='height',
-            fullscr=not args.windowed,  # Use windowed argument to determine fullscreen
-            screen=2,  # Use second monitor
-            color='gray'
-        )
-        
-        self.win2 = visual.Window(
-            size=(860, 480),
-            units='height',
-            fullscr=not args.windowed,  # Use windowed argument to determine fullscreen
-            screen=0,  # Use primary monitor
-            color='gray'
-        )
-        
-        # Create text stimulus for both windows
-        self.text_stim1 = visual.TextStim(
-            win=self.win1,
-            text='',
-            height=0.05,
-            wrapWidth=0.8
-        )
-        
-        self.text_stim2 = visual.TextStim(
-            win=self.win2,
-            text='',
-            height=0.05,
-            wrapWidth=0.8
-        )
-        
-        # VO2Max timing sequence (in seconds)
-        self.vo2max_intervals = [1, 120, 360, 600, 840, 1080]
 
         # Dictionary for text mappings
         self.text_mapping = {
@@ -61,35 +57,247 @@ class ExperimentFlow:
             "cool_down": "Cool Down",
             "experiment_over": "The experiment is over. Thank you for your participation."
         }
-        
+        # Integer event codes instead of marker strings (None: send strings)
+        self.codebook = build_codebook(self.text_mapping, titles, physio_labels=list(physio_streams or {})) \
+            if event_codes else None
+        # Confirmed answers of every assessment, e.g. self.responses.latest('arousal')
+        self.responses = ResponseStore(question_keys)
+
         self.filename = filename  # Store the log filename
-        self.setup_logging()  # Set up logging when initializing
+        self.flush_interval = flush_interval  # Seconds between batched writes to disk
+        self.log_format = log_format  # 'csv' or 'binary'
+        # Live physiology, e.g. {'hr': 'HeartRate', 'vo2': 'VO2'} (label: LSL stream name)
+        self.physio = PhysioMonitor(physio_streams, window=physio_window) if physio_streams else None
+
+        # The LSL outlet, input listener and log do not need the windows: set them up on a
+        # helper thread while this thread imports PsychoPy and opens the windows (OpenGL
+        # windows have to be created on the main thread)
+        self._startup_error = None
+        services = threading.Thread(target=self._start_services, args=(event_codes,), name='StartupServices')
+        services.start()
+
+        with self._stage('import_psychopy'):
+            visual.load()
+            event.load()
+            core.load()
+
+        # Create two windows based on fullscreen parameter
+        with self._stage('window_participant'):
+            self.win1 = visual.Window(
+                size=(860, 480),
+                units='height',
+                fullscr=fullscreen,  # Use fullscreen parameter (from --windowed)
+                screen=2,  # Use second monitor
+                color='gray'
+            )
+        
+        with self._stage('window_experimenter'):
+            self.win2 = visual.Window(
+                size=(860, 480),
+                units='height',
+                fullscr=fullscreen,  # Use fullscreen parameter (from --windowed)
+                screen=0,  # Use primary monitor
+                color='gray'
+            )
+        
+        with self._stage('display'):
+            # Flip both windows together (see display.DualDisplay for the modes)
+            self.display = DualDisplay(self.win1, self.win2, mode=display_mode, target_fps=target_fps)
+            self.idle = idle  # Static screens sleep between input polls instead of redrawing every frame
+            self.mouse_lock_rate = mouse_lock_rate  # Pointer resets per second during assessments
+            
+            # Optional per-frame timing of every draw/flip cycle
+            self.frame_timer = None
+            if frame_timing or frame_diagnostics:
+                # Frames are judged against the paced rate when one is set
+                self.frame_timer = FrameTimer(frame_period=self.display.target_period or self.display.frame_period,
+                                              diagnostics_outlet=frame_diagnostics)
+                self.display.frame_timer = self.frame_timer
+            
+            # Create text stimulus for both windows
+            self.text_stim1 = visual.TextStim(
+                win=self.win1,
+                text='',
+                height=0.05,
+                wrapWidth=0.8
+            )
+            
+            self.text_stim2 = visual.TextStim(
+                win=self.win2,
+                text='',
+                height=0.05,
+                wrapWidth=0.8
+            )
+
+            # Rolling HR/VO2 values for the experimenter, refreshed about once a second
+            self.physio_stim = visual.TextStim(
+                win=self.win2,
+                text='',
+                pos=(0, -0.4),
+                height=0.04,
+                wrapWidth=1.6
+            )
+            self._physio_due = 0.0
+        
+        # VO2Max timing sequence (in seconds)
+        self.vo2max_intervals = [1, 120, 360, 600, 840, 1080]
+        self.timeline = None  # Built when the VO2Max sequence starts
+        
+        self.static_layers = static_layers  # Draw questionnaire pages from cached static images
+        self.measure_latency = measure_latency  # Log click-to-photon latency during assessments
+
+        # CPU time and wall time spent in each screen, reported at cleanup
+        self.cpu_usage = {}
+        self._phase = None
+
+        with self._stage('wait_services'):
+            services.join()
+        if self._startup_error is not None:
+            raise self._startup_error
         # Remove mouse_lock_active, mouse_lock_thread, and terminate_requested if only used for mouse lock
 
+    def _stage(self, name):
+        """Time a start-up stage when profiling, e.g. `with self._stage('outlet'):`"""
+        return self.startup.stage(name) if self.startup is not None else contextlib.nullcontext()
+
+    def _start_services(self, event_codes):
+        """Create the LSL outlet, the input listener and the log writer (start-up helper thread)"""
+        try:
+            # Set up LSL stream
+            with self._stage('outlet'):
+                if event_codes:
+                    # (code, value) pairs; names are in the codebook written next to the log
+                    self.info = StreamInfo('StimEventCodes', 'Markers', 2, 0, 'int32', 'uniqueid_codes')
+                    channels = self.info.desc().append_child('channels')
+                    for label in ('code', 'value'):
+                        channels.append_child('channel').append_child_value('label', label)
+                else:
+                    self.info = StreamInfo('StimMarkers', 'Markers', 1, 0, 'string', 'uniqueid')
+                self.outlet = StreamOutlet(self.info)
+
+            # One input listener for the whole session, shared with every RPE assessment
+            with self._stage('input_service'):
+                self.input_service = InputService(clock=local_clock)  # Buttons stamped on the LSL clock in the listener thread
+                self.input_service.start()
+
+            if self.physio is not None:
+                with self._stage('physio'):
+                    self.physio.start()  # Resolves the streams on its own thread
+
+            with self._stage('logging'):
+                if self.codebook is not None:
+                    self.codebook.write(os.path.splitext(self.filename)[0] + '_codebook.csv')  # e.g. data_log_codebook.csv
+                self.setup_logging()  # Set up logging when initializing
+        except Exception as e:
+            self._startup_error = e  # Raised again on the main thread
+
+    def first_frame(self):
+        """Report the start-up profile once the first frame is on screen"""
+        if self.startup is None or not self.startup.first_frame():
+            return
+        print(f"Startup: {self.startup.report()}")
+        # Profile next to the marker log, e.g. data_log_startup.json
+        self.startup.write_report(os.path.splitext(self.filename)[0] + '_startup.json')
+
     def setup_logging(self):
-        """Set up the CSV file for logging data."""
-        self.log_file = open(self.filename, mode='w', newline='')
-        self.csv_writer = csv.writer(self.log_file)
-        self.csv_writer.writerow(['StimMarkersAlpha', 'Timestamp'])  # Write header row
+        """Set up the background writer for the log file (CSV or binary)."""
+        if self.log_format == 'binary':
+            # Binary records go next to the CSV name, e.g. data_log.bin (+ data_log.bin.strings)
+            sink = BinarySink(os.path.splitext(self.filename)[0] + '.bin', codebook=self.codebook)
+        elif self.codebook is not None:
+            sink = CsvSink(self.filename, header=['EventCode', 'Timestamp', 'LSLTimestamp', 'Value'])
+        else:
+            sink = CsvSink(self.filename, header=['StimMarkersAlpha', 'Timestamp', 'LSLTimestamp'])
+        self.marker_writer = MarkerWriter(sink, flush_interval=self.flush_interval)
 
     def log_data(self, data):
-        """Log data to the CSV file."""
-        self.csv_writer.writerow(data)  # Write timestamp and data to CSV
+        """Queue a [marker, wall time, LSL time] row for the log file (written by the logger thread)."""
+        self.marker_writer.write(data, data[2])  # Write timestamp and data to the log
 
     def push_sample(self, data):
-        """Push sample to LSL and log it."""
-        self.outlet.push_sample(data)  # Original LSL push
-        timestamp = time.time()
-        self.log_data(data + [timestamp])  # Log the entire data array locally
+        """Push sample to LSL and log it, both with the same LSL timestamp."""
+        lsl_timestamp = self.clock.now()  # Read the clock once per event
+        self.outlet.push_sample(data, lsl_timestamp)
+        self.log_data(data + [self.clock.to_wall(lsl_timestamp), lsl_timestamp])  # Log the entire data array locally
+        return lsl_timestamp
+
+    def push_event(self, name, value=NO_VALUE):
+        """Push an event by its codebook name, as an event code or as a marker string; returns its LSL time"""
+        if self.codebook is None:
+            return self.push_sample(event_sample(None, name, value))
+        lsl_timestamp = self.clock.now()
+        self.outlet.push_sample(event_sample(self.codebook, name, value), lsl_timestamp)
+        self.log_data(event_row(self.codebook, name, value, self.clock.to_wall(lsl_timestamp), lsl_timestamp))
+        return lsl_timestamp
+
+    def stamp_physio(self, lsl_timestamp):
+        """Log the rolling mean and slope of every physiological stream at an event's time.
+
+        Written to the local log only (the streams themselves are on LSL), as integers in
+        hundredths, e.g. 'hr_mean_x100: 14230' for 142.3 bpm. Streams with no samples in
+        the window before the event (e.g. a device that dropped out) are skipped.
+        """
+        if self.physio is None:
+            return
+        wall_time = self.clock.to_wall(lsl_timestamp)
+        for label, stats in self.physio.stats(now=lsl_timestamp).items():
+            if stats is None:
+                continue
+            for name in ('mean', 'slope_per_min'):
+                self.log_data(event_row(self.codebook, f'{label}_{name}_x100: {{}}', int(round(stats[name] * 100)),
+                                        wall_time, lsl_timestamp))
+
+    def refresh_physio(self):
+        """Update the physiology line on win2 about once a second; True if its text changed"""
+        if self.physio is None or time.perf_counter() < self._physio_due:
+            return False
+        self._physio_due = time.perf_counter() + 1.0
+        text = self.physio.text()
+        if text == self.physio_stim.text:
+            return False
+        self.physio_stim.text = text
+        return True
+
+    def draw_screen(self):
+        """Draw the screen text on both windows, with the physiology line on win2"""
+        if self.physio is not None:
+            self.physio_stim.draw()
+        self.text_stim1.draw()
+        self.text_stim2.draw()
+
+    def begin_phase(self, name):
+        """Charge the CPU and wall time from now on to `name`, closing the current phase"""
+        now = (time.process_time(), time.perf_counter())
+        if self._phase is not None:
+            previous, cpu_start, wall_start = self._phase
+            cpu, wall = self.cpu_usage.get(previous, (0.0, 0.0))
+            self.cpu_usage[previous] = (cpu + now[0] - cpu_start, wall + now[1] - wall_start)
+        self._phase = (name, *now) if name is not None else None
+
+    def cpu_report(self):
+        """Return CPU seconds, wall seconds and CPU load (%) of each phase"""
+        return {name: {'cpu_s': round(cpu, 3), 'wall_s': round(wall, 3),
+                       'cpu_percent': round(100 * cpu / wall, 1) if wall else 0.0}
+                for name, (cpu, wall) in self.cpu_usage.items()}
+
+    def wait_frame(self):
+        """Wait one frame on a static screen: idle, or redraw it when idle mode is off"""
+        if self.idle:
+            self.display.idle()
+        else:
+            self.text_stim1.draw()
+            self.text_stim2.draw()
+            self.display.flip()
 
     def show_screen(self, key, wait_for_space=True, duration=None):
         """Display screen with text and optionally wait for spacebar"""
+        self.begin_phase(key)
         text = self.text_mapping[key]  # Get the text from the mapping
         self.text_stim1.text = ''
         self.text_stim2.text = text
         
         # Send LSL onset marker
-        self.push_sample([f'{key}_onset'])  # Use the key for LSL onset marker
+        self.push_event(f'{key}_onset')  # Use the key for LSL onset marker
 
         if key == 'waiting_experiment':
             self.text_stim1.text = text
@@ -99,71 +307,76 @@ class ExperimentFlow:
             self.text_stim1.text = text
             self.text_stim2.text = "Experiment Over.\n5 minutes have passed. Record HR in REDCap"
         if key == "cool_down":
-            # Start the cool down timer
-            start_time = time.time()
-            elapsed_time = 0
-            while elapsed_time < 300:  # 5 minutes = 300 seconds
+            # Timer-driven state machine: each HR marker fires once when its minute is due,
+            # keys are polled every frame and the screen is only redrawn when its text changes
+            cool_down = Timeline([(60 * minutes, minutes) for minutes in range(1, 5)] + [(300, None)],
+                                 clock=self.clock.now)
+            cool_down.start()
+            self.text_stim1.text = ""
+            self.text_stim2.text = "Cool Down"
+            redraw = True
+            while True:
                 if self.terminate_requested:
                     return
-                # Update the text stimulus for every minute
-                minutes_passed = int(elapsed_time // 60)
-                if 1 <= minutes_passed <= 5:  # Only show this message for the first 5 minutes
-                    self.push_sample([f'{key}_{minutes_passed}_hr'])
+                due = cool_down.poll()
+                if due is not None:
+                    if due.name is None:
+                        break  # 5 minutes = 300 seconds have passed
+                    minutes_passed = due.name
+                    self.stamp_physio(self.push_event(f'{key}_{minutes_passed}_hr'))
                     if minutes_passed == 1:
                         self.text_stim2.text = f"Cool Down\n{minutes_passed} minute has passed. Record HR in REDCap"
                     else:
                         self.text_stim2.text = f"Cool Down\n{minutes_passed} minutes have passed. Record HR in REDCap"
-                else:
-                    self.text_stim2.text = "Cool Down"
-                self.text_stim1.text = ""
+                    redraw = True
+                if self.refresh_physio():
+                    redraw = True
 
-                # Draw text stimuli in both windows
-                self.text_stim1.draw()
-                self.text_stim2.draw()
-                self.win1.flip()
-                self.win2.flip()
+                if redraw:
+                    # Draw text stimuli in both windows
+                    self.draw_screen()
+                    self.display.flip()
+                    redraw = False
 
                 # Check for spacebar to skip
                 keys = event.getKeys(['space', 'escape'])
                 if 'escape' in keys:
                     self.cleanup()
                     return
-                if 'space' in keys and elapsed_time > 200:
+                if 'space' in keys and self.clock.now() - cool_down.start_time > 200:
                     break  # Skip to the next screen
 
-                # Update elapsed time
-                elapsed_time = time.time() - start_time
-                core.wait(1)  # Wait for 1 second before the next update
+                self.display.idle()  # Poll again next frame
 
             # After 5 minutes, transition to the experiment_over screen
-            self.push_sample([f'cool_down_5_hr'])
-            self.push_sample([f'{key}_offset'])  # Send LSL offset marker
+            self.stamp_physio(self.push_event('cool_down_5_hr'))
+            self.push_event(f'{key}_offset')  # Send LSL offset marker
             self.show_screen("experiment_over", wait_for_space=True)
 
         else:
+            # Draw text stimuli in both windows once; later frames only poll the keys
+            self.text_stim1.draw()
+            self.text_stim2.draw()
+            self.display.flip()
+            self.first_frame()
             if duration:
                 timer = core.CountdownTimer(duration)
+                prewarmed = key != 'warmup'
                 while timer.getTime() > 0:
                     if self.terminate_requested:
                         return
-                    # Draw text stimuli in both windows
-                    self.text_stim1.draw()
-                    self.text_stim2.draw()
-                    self.win1.flip()
-                    self.win2.flip()
+                    if not prewarmed:
+                        # Build the questionnaire pages while the warmup text is on screen
+                        prewarm_pages(self.win1, self.win2, full=True, static_layers=self.static_layers)
+                        prewarmed = True
                     if event.getKeys(['escape']):
                         self.cleanup()
                         return
+                    self.wait_frame()
             else:
                 while True:
                     if self.terminate_requested:
                         return
-                    # Draw text stimuli in both windows
-                    self.text_stim1.draw()
-                    self.text_stim2.draw()
-                    self.win1.flip()
-                    self.win2.flip()
-                    
                     keys = event.getKeys(['space', 'escape'])
                     if 'escape' in keys:
                         self.cleanup()
@@ -172,16 +385,22 @@ class ExperimentFlow:
                         # Check if the key contains 'waiting'
                         if 'waiting' not in key:
                             # Send LSL offset marker only if the key does not contain 'waiting'
-                            self.push_sample([f'{key}_offset'])  # Use the key for LSL offset marker
+                            self.push_event(f'{key}_offset')  # Use the key for LSL offset marker
                         break
+                    self.wait_frame()
 
     def run_rpe_assessment(self, full=False):
         """Run the RPE assessment using the imported function"""
-        self.push_sample(['rpe_onset'])
-        responses = run_rpe(win1=self.win1, win2=self.win2, full=full, outlet=self.outlet)  # Ensure both windows are passed
-        for data in responses[1]:
-            self.log_data(data)
-        self.push_sample(['rpe_offset'])
+        self.push_event('rpe_onset')
+        resume_phase = self._phase[0] if self._phase is not None else None
+        self.begin_phase('rpe')
+        responses = run_rpe(win1=self.win1, win2=self.win2, full=full, outlet=self.outlet, clock=self.clock,
+                            input_service=self.input_service, display=self.display,
+                            static_layers=self.static_layers, measure_latency=self.measure_latency,
+                            mouse_lock_rate=self.mouse_lock_rate, codebook=self.codebook,
+                            responses=self.responses, log=self.log_data)  # Ensure both windows are passed
+        self.begin_phase(resume_phase)
+        self.push_event('rpe_offset')
         
         if responses is None:  # Check if the RPE assessment was terminated
             print("RPE assessment was terminated by the user.")
@@ -192,23 +411,29 @@ class ExperimentFlow:
     def vo2max_sequence(self):
         self.show_screen("warmup", duration=10)
         terminate = False
-        self.push_sample(['vo2max_offset'])
-        start_time = time.time()
-        next_interval_idx = 0
+        self.push_event('vo2max_offset')
+        # Schedule every assessment up front; the 10 s warmup counts toward protocol time
+        self.timeline = Timeline([(interval, interval) for interval in self.vo2max_intervals],
+                                 clock=self.clock.now)
+        self.timeline.start(self.clock.now() - 10)
 
         keys = event.getKeys(['space', 'escape', 'return', 'enter'])
         keys.remove('return') if 'return' in keys else keys
 
-        while next_interval_idx < len(self.vo2max_intervals) and not terminate:
+        self.begin_phase('vo2max')
+        redraw = True
+        while not self.timeline.finished() and not terminate:
             if self.terminate_requested:
                 return
-            # Show VO2Max screen in both windows
-            self.text_stim1.text = ""
-            self.text_stim2.text = "VO2Max"
-            self.text_stim1.draw()
-            self.text_stim2.draw()
-            self.win1.flip()
-            self.win2.flip()
+            if self.refresh_physio():
+                redraw = True
+            if redraw:
+                # Show VO2Max screen in both windows (again after each assessment)
+                self.text_stim1.text = ""
+                self.text_stim2.text = "VO2Max"
+                self.draw_screen()
+                self.display.flip()
+                redraw = not self.idle
 
             keys = event.getKeys(['space', 'escape', 'return', 'enter'])
             if 'return' in keys or 'enter' in keys:
@@ -217,16 +442,24 @@ class ExperimentFlow:
                 self.cleanup()
                 return
             if 'space' in keys or terminate:
-                self.push_sample(['vo2max_offset'])
+                self.push_event('vo2max_offset')
                 break
 
-            # Check if it's time for RPE assessment
-            current_time = time.time() - start_time + 10
-            if next_interval_idx < len(self.vo2max_intervals) and current_time >= self.vo2max_intervals[next_interval_idx]:
-                self.push_sample([f'rpe_assessment: {self.vo2max_intervals[next_interval_idx]}s'])
+            # Run the RPE assessment as soon as it is due
+            due = self.timeline.poll()
+            if due is not None:
+                self.push_event('rpe_assessment: {}s', due.name)  # Stamped at the actual firing time
+                self.log_scheduled(due)
                 terminate = self.run_rpe_assessment(full=True)
                 terminate = terminate[0]
-                next_interval_idx += 1
+                redraw = True
+            elif self.idle:
+                self.display.idle(min(self.display.frame_period, max(self.timeline.time_until_next(), 0)))
+
+    def log_scheduled(self, fired):
+        """Log the scheduled time of an assessment next to its actual marker"""
+        self.log_data(event_row(self.codebook, 'rpe_assessment_scheduled: {}s', fired.name,
+                                self.clock.to_wall(fired.scheduled), fired.scheduled))
 
     def run_experiment(self):
         # Make the mouse invisible at the start of the experiment
@@ -254,7 +487,27 @@ class ExperimentFlow:
     def cleanup(self):
         """Clean up and exit"""
         self.terminate_requested = True
-        self.log_file.close()  # Close the log file
+        self.begin_phase(None)
+        self.input_service.stop()
+        if self.physio is not None:
+            print(f"Physio: {self.physio.report()}")
+            self.physio.stop()
+        self.marker_writer.close()  # Drain queued rows and close the log file
+        print(f"Marker log: {self.marker_writer.stats()}")
+        # Confirmed answers next to the log, e.g. data_log_responses.csv
+        self.responses.write(os.path.splitext(self.filename)[0] + '_responses.csv')
+        # LSL/wall-clock offset table next to the log, e.g. data_log_clock_offsets.csv
+        self.clock.record_offset()
+        self.clock.write_offsets(os.path.splitext(self.filename)[0] + '_clock_offsets.csv')
+        print(f"Display: {self.display.report()}")
+        # Per-flip times of both windows next to the log, e.g. data_log_flips.csv
+        self.display.write_flips(os.path.splitext(self.filename)[0] + '_flips.csv')
+        print(f"CPU usage: {self.cpu_report()}")
+        if self.timeline is not None:
+            print(f"Timeline: {self.timeline.report()}")
+        if self.frame_timer is not None:
+            # Frame report goes next to the marker log, e.g. data_log_frames.json
+            self.frame_timer.write_report(os.path.splitext(self.filename)[0] + '_frames.json')
         self.win1.close()
         self.win2.close()
         core.quit()
@@ -268,8 +521,80 @@ if __name__ == "__main__":
                         type=str, 
                         default='data_log.csv', 
                         help='Filename for logging data locally.')  # Added filename argument
+    parser.add_argument('--flush-interval',
+                        type=float,
+                        default=0.5,
+                        help='Seconds between batched writes of the local log to disk.')
+    parser.add_argument('--log-format',
+                        choices=['csv', 'binary'],
+                        default='csv',
+                        help='Format of the local log: CSV text or fixed-width binary records.')
+    parser.add_argument('--display-mode',
+                        choices=DISPLAY_MODES,
+                        default='serial',
+                        help='serial: flip both windows in turn; primary (opt-in): turn off vsync on the experimenter window so only the participant window waits for it.')
+    parser.add_argument('--frame-timing',
+                        action='store_true',
+                        help='Record per-frame timing and write a dropped-frame report next to the log.')
+    parser.add_argument('--frame-diagnostics',
+                        action='store_true',
+                        help='Also stream frame timing once per second on an LSL diagnostics stream.')
+    parser.add_argument('--static-layers',
+                        action='store_true',
+                        help='Draw the static text of questionnaire pages from cached images.')
+    parser.add_argument('--latency',
+                        action='store_true',
+                        help='Log the latency from each button press to the first frame showing it.')
+    parser.add_argument('--target-fps',
+                        type=float,
+                        default=None,
+                        help='Pace the draw loops to this many frames per second (default: every refresh).')
+    parser.add_argument('--no-idle',
+                        action='store_true',
+                        help='Redraw static screens every frame instead of sleeping between input polls.')
+    parser.add_argument('--event-codes',
+                        action='store_true',
+                        help='Send int32 (code, value) events instead of marker strings and write a codebook next to the log.')
+    parser.add_argument('--mouse-lock-rate',
+                        type=float,
+                        default=20,
+                        help='Times per second the pointer is reset during RPE assessments (0 disables it).')
+    parser.add_argument('--hr-stream',
+                        type=str,
+                        default=None,
+                        help='Name of a heart-rate LSL stream to show on the experimenter screen and log at each cool-down minute.')
+    parser.add_argument('--vo2-stream',
+                        type=str,
+                        default=None,
+                        help='Name of a VO2 LSL stream, shown and logged like --hr-stream.')
+    parser.add_argument('--physio-window',
+                        type=float,
+                        default=10.0,
+                        help='Seconds of physiological samples behind each rolling mean and slope.')
+    parser.add_argument('--profile-startup',
+                        action='store_true',
+                        help='Print how long each start-up stage took until the first frame and write it next to the log.')
     args = parser.parse_args()
+    if args.mouse_lock_rate < 0:
+        parser.error('--mouse-lock-rate must be 0 (disabled) or positive')
+
+    startup = None
+    if args.profile_startup:
+        startup = StartupProfile(start=_script_start)
+        startup.add('import numpy', _script_start, _numpy_done)
+        startup.add('import pylsl', _numpy_done, _pylsl_done)
+        startup.add('imports', _pylsl_done, _imports_done)
+        startup.add('parse_args', _imports_done, time.perf_counter())
     
+    physio_streams = {label: name for label, name in (('hr', args.hr_stream), ('vo2', args.vo2_stream)) if name}
+
     # Initialize with screen=1 for second monitor (adjust if needed)
-    experiment = ExperimentFlow(screen=0, fullscreen=not args.windowed, filename=args.filename)  # Pass filename
+    experiment = ExperimentFlow(screen=0, fullscreen=not args.windowed, filename=args.filename,  # Pass filename
+                                flush_interval=args.flush_interval, log_format=args.log_format,
+                                display_mode=args.display_mode, frame_timing=args.frame_timing,
+                                frame_diagnostics=args.frame_diagnostics, static_layers=args.static_layers,
+                                measure_latency=args.latency, target_fps=args.target_fps,
+                                idle=not args.no_idle, mouse_lock_rate=args.mouse_lock_rate,
+                                event_codes=args.event_codes, startup_profile=startup,
+                                physio_streams=physio_streams, physio_window=args.physio_window)
     experiment.run_experiment()